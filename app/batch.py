@@ -0,0 +1,49 @@
+from typing import Annotated, Iterable
+from uuid import UUID
+
+from fastapi import HTTPException, Query, status
+from fastapi.responses import Response
+from sqlalchemy import any_, cast, literal
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+
+from app.config import settings
+from app.schemas.batch import BatchOut
+
+BatchIds = Annotated[
+    list[UUID],
+    Query(alias="ids", description="Identifiants à récupérer (paramètre répété : ?ids=...&ids=...)"),
+]
+
+UUID_ARRAY = ARRAY(PG_UUID(as_uuid=True))
+
+
+def unique_ids(ids: list[UUID]) -> list[UUID]:
+    """Dédoublonne les ids en conservant l'ordre et applique la taille maximale d'un lot."""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucun identifiant fourni.")
+    if len(ids) > settings.batch_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Trop d'identifiants : {settings.batch_max_ids} au maximum par requête.",
+        )
+    return ids
+
+
+def id_in(column, ids: list[UUID]):
+    # Un seul paramètre tableau (id = ANY(...)) : le texte SQL ne dépend pas
+    # du nombre d'ids, contrairement à IN (...)
+    return column == any_(cast(literal(ids, UUID_ARRAY), UUID_ARRAY))
+
+
+def batch_response(schema, ids: list[UUID], rows: Iterable) -> Response:
+    """Sérialise les lignes trouvées indexées par id, dans l'ordre demandé."""
+    found = {row.id: row for row in rows}
+    model = BatchOut[schema].model_validate(
+        {
+            "items": {id_: found[id_] for id_ in ids if id_ in found},
+            "missing": [id_ for id_ in ids if id_ not in found],
+        },
+        from_attributes=True,
+    )
+    return Response(content=model.model_dump_json(), media_type="application/json")
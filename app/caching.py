@@ -0,0 +1,76 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+# Politique Cache-Control par route
+CACHE_POLICIES = {
+    "residences": "public, max-age=60",
+    "profile": "private, no-cache",
+    "public_form": "private, no-cache",
+    "reports": "private, no-cache",
+    # Un rapport généré n'est jamais modifié, seulement supprimé
+    "report": "private, max-age=3600",
+}
+
+
+def make_etag(*parts) -> str:
+    """ETag faible dérivé des versions (id, updated_at, nombre de lignes...).
+
+    Faible car le corps transmis peut varier (compression) sans que la
+    ressource change.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    # Les dates naïves sont en heure locale (datetime.now)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.astimezone(timezone.utc).replace(microsecond=0) <= since
+
+
+def cache_headers(etag: str, policy: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_POLICIES[policy]}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def check_not_modified(request: Request, response: Response, etag: str, policy: str,
+                       last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Pose les en-têtes de cache sur la réponse et renvoie une 304 si le client est à jour.
+
+    If-None-Match prime sur If-Modified-Since (RFC 9110).
+    """
+    headers = cache_headers(etag, policy, last_modified)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = bool(if_modified_since and last_modified and _not_modified_since(if_modified_since, last_modified))
+
+    if fresh:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
@@ -0,0 +1,179 @@
+import threading
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import COMPRESSION_BYTES_IN, COMPRESSION_BYTES_OUT
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : gzip seul sinon
+    brotli = None
+
+
+class CompressionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def observe(self, bytes_in: int, bytes_out: int):
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+        COMPRESSION_BYTES_IN.inc(bytes_in)
+        COMPRESSION_BYTES_OUT.inc(bytes_out)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+            }
+
+
+compression_stats = CompressionStats()
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compresse (brotli ou gzip) les réponses dont le type est autorisé et
+    dont la taille dépasse le seuil.
+
+    Les corps déjà encodés (Content-Encoding présent), les réponses partielles
+    et les types absents de la liste (PDF, images, archives) sont transmis tels quels.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, content_types: list[str] | None = None,
+                 gzip_level: int = 6, brotli_quality: int = 4, enable_brotli: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_types or ["application/json"])
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enable_brotli = enable_brotli and brotli is not None
+
+    def _choose_encoder(self, accept_encoding: str):
+        accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+        if self.enable_brotli and "br" in accepted:
+            return _BrotliEncoder(self.brotli_quality)
+        if "gzip" in accepted:
+            return _GzipEncoder(self.gzip_level)
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if not accept_encoding or self._choose_encoder(accept_encoding) is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, accept_encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, accept_encoding: str, send: Send):
+        self.middleware = middleware
+        self.accept_encoding = accept_encoding
+        self._send = send
+        self.start_message: Message | None = None
+        self.encoder = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _eligible(self, headers: Headers, status: int) -> bool:
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type.startswith(self.middleware.content_types)
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = not self._eligible(headers, message["status"])
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            # Corps complet en un seul message : on peut appliquer le seuil
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            self.encoder = self.middleware._choose_encoder(self.accept_encoding)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoder.name
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["content-length"]
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                # Le corps transmis diffère : l'ETag devient faible
+                headers["etag"] = f"W/{headers['etag']}"
+
+            if not more_body:
+                compressed = self.encoder.compress(body) + self.encoder.flush()
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": compressed})
+                compression_stats.observe(len(body), len(compressed))
+                return
+
+            await self._send(self.start_message)
+
+        self.bytes_in += len(body)
+        chunk = self.encoder.compress(body)
+        if not more_body:
+            chunk += self.encoder.flush()
+        self.bytes_out += len(chunk)
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        if not more_body:
+            compression_stats.observe(self.bytes_in, self.bytes_out)
@@ -1,13 +1,109 @@
+from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+BASE_DIR = Path(__file__).resolve().parent.parent
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="allow")
 
     postgres_url: str
     access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 30
     secret_key: str
     algorithm: str = "HS256"
     cors_origin:str="*"
+    report_cache_minutes: int = 60
+    token_cache_size: int = 4096
+
+    # Compression des réponses
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_content_types: str = "application/json,text/csv,text/plain,application/x-ndjson"
+    compression_brotli: bool = True
+
+    # Serveur de production (python -m app.server)
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_workers: int | None = None  # défaut : nombre de CPU disponibles
+    web_max_requests: int = 10000  # recyclage d'un worker après N requêtes (0 = jamais)
+    web_max_requests_jitter: int = 1000  # + 0..N requêtes tirées par worker : recyclages étalés
+    web_keep_alive_seconds: int = 75  # supérieur au délai d'inactivité du proxy
+    web_backlog: int = 2048
+    web_access_log: bool = False
+    forwarded_allow_ips: str = "127.0.0.1"
+
+    # Connexions PostgreSQL : le budget est partagé entre les workers
+    db_connection_budget: int = 40
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+
+    # Suivi des requêtes SQL par requête HTTP
+    slow_query_ms: int = 200
+    query_repeat_threshold: int = 10  # même requête N fois : N+1 probable
+    query_strict: bool = False  # tests : échec si budget ou seuil N+1 dépassé
+    query_count_header: bool = False  # en-tête X-Query-Count
+
+    # Traçage OpenTelemetry : exporteur "file" (JSON ligne par ligne), "console" ou "otlp"
+    tracing_enabled: bool = False
+    tracing_exporter: str = "file"
+    tracing_file: str = "traces/traces-{pid}.jsonl"
+    tracing_sample_ratio: float = 1.0
+    tracing_service_name: str = "welqo-api"
+
+    # Profilage d'une requête à la demande (en-tête X-Profile: <jeton>)
+    profiling_enabled: bool = False
+    profiling_token: str | None = None
+    profiling_dir: str = "profiles"
+    profiling_tracemalloc_frames: int = 10
+
+    # Partitions mensuelles de guard_qr_scans créées à l'avance au démarrage
+    partition_months_ahead: int = 3
+
+    # Exposition Prometheus sur /metrics
+    metrics_enabled: bool = True
+
+    # Nombre maximal d'ids par requête /batch
+    batch_max_ids: int = 100
+
+    # Hachage des mots de passe : le premier schéma sert aux nouveaux hachages,
+    # les suivants sont seulement vérifiés puis migrés à la connexion
+    password_schemes: str = "bcrypt"
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536
+    argon2_parallelism: int = 4
+
+    # Limitation des tentatives de connexion et de réinitialisation : "memory" ou "redis"
+    rate_limit_backend: str = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    trust_forwarded_for: bool = False
+    login_max_attempts_per_phone: int = 5
+    login_max_attempts_per_ip: int = 20
+    login_window_seconds: int = 300
+    password_reset_max_attempts_per_phone: int = 3
+    password_reset_max_attempts_per_ip: int = 10
+    password_reset_window_seconds: int = 3600
+    lockout_base_seconds: int = 30
+    lockout_max_seconds: int = 3600
+
+    # Pool dédié au hachage des mots de passe
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+
+    # Stockage des rapports et logos : "local" ou "s3"
+    storage_backend: str = "local"
+    storage_root: str = str(BASE_DIR)
+    s3_bucket: str | None = None
+    s3_prefix: str = ""
+    s3_endpoint_url: str | None = None
+    s3_region: str | None = None
+    s3_access_key_id: str | None = None
+    s3_secret_access_key: str | None = None
+    storage_presigned_url_minutes: int = 5
+
+    # Téléchargements : "none", "x-accel" (nginx), "sendfile" ou "redirect" (URL S3 pré-signée)
+    download_offload: str = "none"
+    x_accel_prefix: str = "/protected"
 
   
 
@@ -0,0 +1,97 @@
+import re
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+
+from app.config import settings
+from app.storage import Storage, StoredObject, attachment_disposition
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag(obj: StoredObject) -> str:
+    return f'"{obj.size:x}-{int(obj.last_modified.timestamp()):x}"'
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Retourne (début, fin) inclus, None pour tout le fichier.
+
+    Les demandes multi-plages sont servies en entier, ce que la RFC 9110 autorise.
+    """
+    if not header or "," in header:
+        return None
+
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # bytes=-N : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def stored_file_response(request: Request, storage: Storage, key: str, filename: str, media_type: str) -> Response:
+    obj = storage.stat(key)
+    if obj is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Fichier introuvable sur le serveur.")
+
+    etag = _etag(obj)
+    headers = {
+        "Content-Disposition": attachment_disposition(filename),
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+    }
+
+    # Délégation de l'envoi au reverse proxy ou au stockage objet
+    offload = settings.download_offload
+    local_path = storage.local_path(key)
+    if offload == "x-accel" and local_path:
+        headers["X-Accel-Redirect"] = f"{settings.x_accel_prefix.rstrip('/')}/{key}"
+        return Response(headers=headers, media_type=media_type)
+    if offload == "sendfile" and local_path:
+        headers["X-Sendfile"] = local_path
+        return Response(headers=headers, media_type=media_type)
+    if offload == "redirect":
+        url = storage.presigned_url(key, filename, media_type)
+        if url:
+            return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    # If-Range : si le fichier a changé depuis, on renvoie tout le fichier
+    if_range = request.headers.get("if-range")
+    byte_range = None
+    if not if_range or if_range == etag:
+        byte_range = parse_range(request.headers.get("range"), obj.size)
+
+    if byte_range is None:
+        if local_path:
+            return FileResponse(local_path, media_type=media_type, headers=headers)
+        headers["Content-Length"] = str(obj.size)
+        return StreamingResponse(storage.iter_range(key, 0, obj.size - 1), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{obj.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        storage.iter_range(key, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers
+    )
@@ -0,0 +1,62 @@
+from functools import lru_cache
+from typing import Annotated, Optional
+
+from fastapi import HTTPException, Query, status
+from pydantic import ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+FieldsQuery = Annotated[
+    Optional[str],
+    Query(description="Champs à renvoyer, séparés par des virgules (ex: name,expires_at). Tous par défaut."),
+]
+
+
+def parse_fields(schema, fields: Optional[str]) -> tuple[str, ...]:
+    """Valide le paramètre ?fields= contre le schéma de réponse.
+
+    Renvoie les champs retenus dans l'ordre du schéma ; tous si le paramètre est absent.
+    """
+    available = tuple(schema.model_fields)
+    if not fields:
+        return available
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(available))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Champs inconnus : {', '.join(unknown)}. Champs disponibles : {', '.join(available)}",
+        )
+    return tuple(name for name in available if name in requested)
+
+
+@lru_cache(maxsize=None)
+def subset_model(schema, fields: tuple[str, ...]):
+    """Modèle de réponse restreint aux champs demandés (mis en cache par combinaison)."""
+    if fields == tuple(schema.model_fields):
+        return schema
+
+    definitions = {
+        name: (info.annotation, info)
+        for name, info in schema.model_fields.items()
+        if name in fields
+    }
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
+
+
+def load_columns(model, fields: tuple[str, ...], *extra):
+    """Option load_only limitée aux colonnes du modèle ORM correspondant aux champs.
+
+    Les champs qui ne sont pas des colonnes (relations, champs calculés) sont ignorés ;
+    la clé primaire est toujours chargée.
+    """
+    columns = inspect(model).column_attrs.keys()
+    attributes = [getattr(model, name) for name in fields if name in columns]
+    attributes.extend(extra)
+    primary_key = [getattr(model, column.key) for column in inspect(model).primary_key]
+    return load_only(*primary_key, *attributes)
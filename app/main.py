@@ -1,24 +1,64 @@
 
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import data, user, auth, guard, qrcode, owner, report, residence
+from app.compression import CompressionMiddleware
+from app.metrics import MetricsMiddleware, mark_worker_dead, metrics_endpoint
+from app.querylog import QueryBudgetExceeded, QueryLogMiddleware
+from app.tracing import TracingMiddleware, init_tracing, shutdown_tracing
+from app.profiling import ProfilingMiddleware
+from app.routers import data, user, auth, guard, qrcode, owner, report, residence, export
 
-from rich.console import Console
 from app.config import settings
-console = Console()
+from app.partitions import ensure_future_partitions
+from app.postgres_connect import SessionLocal, dispose_engine, init_engine
+from app.storage import LOGOS_PREFIX, REPORTS_PREFIX, get_storage
+
+
+def cleanup_report_files(console):
+    # Supprime les PDF qui ne sont plus référencés par aucun rapport
+    db = SessionLocal()
+    try:
+        removed = report.collect_unreferenced_reports(db)
+        if removed:
+            console.print(f"[yellow]{removed} rapport(s) orphelin(s) supprimé(s)[/]")
+    except Exception as e:
+        console.print(f"[red]Nettoyage des rapports impossible: {e}[/]")
+    finally:
+        db.close()
+
+
+def prepare_scan_partitions(console, engine):
+    # Partitions des mois à venir ; sans elles les scans iraient dans la partition par défaut
+    try:
+        ensure_future_partitions(engine)
+    except Exception as e:
+        console.print(f"[red]Création des partitions de scans impossible: {e}[/]")
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
+    # rich n'est utile qu'ici : import différé pour accélérer le démarrage
+    from rich.console import Console
+    console = Console()
+
     console.print(":banana: [cyan underline] Welqo services  is starting ...[/]")
+    engine = init_engine()
+    prepare_scan_partitions(console, engine)
+    init_tracing()
+    get_storage().prepare((REPORTS_PREFIX, LOGOS_PREFIX))
+    cleanup_report_files(console)
     yield
+    dispose_engine()
+    shutdown_tracing()
+    mark_worker_dead()
     console.print(":mango: [bold red underline] Welqo services  shutting down ...[/]")
 
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # origins = ["http://95.111.231.146"]
 origins =settings.cors_origin.split(",")
@@ -31,6 +71,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        content_types=[t.strip() for t in settings.compression_content_types.split(",") if t.strip()],
+        enable_brotli=settings.compression_brotli,
+    )
+
+app.add_middleware(QueryLogMiddleware)
+app.add_middleware(TracingMiddleware)
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
+
+@app.exception_handler(QueryBudgetExceeded)
+async def query_budget_exceeded_handler(_request: Request, exc: QueryBudgetExceeded):
+    return ORJSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content={"detail": str(exc)})
+
+# Ajouté en dernier : le plus externe, il mesure aussi la compression
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 # Ajout de la route racine
 @app.get("/")
 async def root():
@@ -49,3 +112,4 @@ app.include_router(guard.router, prefix="/api/v1")
 app.include_router(qrcode.router, prefix="/api/v1")
 app.include_router(owner.router, prefix="/api/v1")
 app.include_router(report.router, prefix="/api/v1")
+app.include_router(export.router, prefix="/api/v1")
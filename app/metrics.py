@@ -0,0 +1,151 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client import REGISTRY
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.querylog import observe_statements, tracking
+
+# Avec plusieurs workers (python -m app.server), chaque processus écrit ses
+# valeurs dans PROMETHEUS_MULTIPROC_DIR et /metrics les agrège
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUESTS = Counter(
+    "welqo_http_requests_total", "Requêtes HTTP par route et statut", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "welqo_http_request_duration_seconds", "Durée des requêtes HTTP", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "welqo_db_queries_per_request", "Nombre de requêtes SQL par requête HTTP", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "welqo_db_time_per_request_seconds", "Temps SQL cumulé par requête HTTP", ["route"], buckets=LATENCY_BUCKETS
+)
+DB_QUERY_LATENCY = Histogram(
+    "welqo_db_query_duration_seconds", "Durée de chaque requête SQL", buckets=LATENCY_BUCKETS
+)
+
+DB_POOL_SIZE = Gauge("welqo_db_pool_size", "Taille du pool de connexions", multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge(
+    "welqo_db_pool_checked_out", "Connexions empruntées au pool", multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "welqo_db_pool_overflow", "Connexions ouvertes au-delà du pool", multiprocess_mode="livesum"
+)
+
+QR_RENDER_SECONDS = Histogram(
+    "welqo_qr_render_seconds", "Génération d'un QR code PNG", buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "welqo_password_hash_seconds", "Durée d'un hachage ou d'une vérification de mot de passe", ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2),
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "welqo_password_hash_queue_wait_seconds", "Attente dans le pool de hachage", buckets=LATENCY_BUCKETS
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "welqo_password_hash_rejected_total", "Hachages refusés (pool saturé, 503)"
+)
+
+PDF_GENERATION_SECONDS = Histogram(
+    "welqo_pdf_generation_seconds", "Génération d'un rapport PDF", ["report_type"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+PDF_SIZE_BYTES = Histogram(
+    "welqo_pdf_size_bytes", "Taille des rapports PDF générés", ["report_type"],
+    buckets=(10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000),
+)
+
+COMPRESSION_BYTES_IN = Counter("welqo_compression_bytes_in_total", "Octets avant compression")
+COMPRESSION_BYTES_OUT = Counter("welqo_compression_bytes_out_total", "Octets après compression")
+
+
+def _observe_query(_state, elapsed, _rowcount, error):
+    # Durée mesurée par le chronométrage partagé de querylog ; requêtes abouties seulement
+    if error is None:
+        DB_QUERY_LATENCY.observe(elapsed)
+
+
+observe_statements(_observe_query)
+
+
+def update_pool_gauges():
+    from app import postgres_connect
+
+    engine = postgres_connect.engine
+    if engine is None or not hasattr(engine.pool, "checkedout"):
+        return
+    DB_POOL_SIZE.set(engine.pool.size())
+    DB_POOL_CHECKED_OUT.set(engine.pool.checkedout())
+    DB_POOL_OVERFLOW.set(max(0, engine.pool.overflow()))
+
+
+def route_template(scope: Scope) -> str:
+    # Gabarit de la route (/api/v1/forms/{form_id}) plutôt que le chemin brut,
+    # pour borner la cardinalité des labels
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # Compteurs SQL partagés avec QueryLogMiddleware
+        with tracking() as queries:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_template(scope)
+                method = scope["method"]
+                HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+                HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+                DB_QUERIES_PER_REQUEST.labels(route).observe(queries.count)
+                DB_TIME_PER_REQUEST.labels(route).observe(queries.seconds)
+                update_pool_gauges()
+
+
+async def metrics_endpoint(_request: Request) -> Response:
+    update_pool_gauges()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_worker_dead():
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from sqlalchemy import (
     Column, String, Text, DateTime, ForeignKey,
-    Integer, Enum as SQLEnum, Boolean
+    Integer, Enum as SQLEnum, Boolean, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import DeclarativeBase, relationship
@@ -22,6 +22,7 @@ class Residence(Base):
     name = Column(String(255), nullable=False)
     address = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     # Relations
     users = relationship("User", back_populates="residence")
@@ -39,6 +40,7 @@ class User(Base):
     appartement = Column(String(255), nullable=False)
     resident = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     # Foreign key vers Residence
     residence_id = Column(UUID(as_uuid=True), ForeignKey("residences.id"), nullable=False)
@@ -59,12 +61,20 @@ class FormData(Base):
     created_at = Column(DateTime, default=datetime.now)
     expires_at = Column(DateTime)
     duration_minutes = Column(Integer)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'))
     user = relationship("User", back_populates="form_data")
 
+    # Copie de user.residence_id : les requêtes par résidence évitent la jointure
+    residence_id = Column(UUID(as_uuid=True), ForeignKey("residences.id"), nullable=True)
+
     guard_scans = relationship("GuardQRScan", back_populates="form_data")
 
+    __table_args__ = (
+        Index("ix_form_data_residence_id_created_at", "residence_id", "created_at"),
+    )
+
 # ----------------- GUARD ------------------
 class Guard(Base):
     __tablename__ = "guards"
@@ -75,6 +85,7 @@ class Guard(Base):
     email = Column(String(255), nullable=True)
     password = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     # Foreign key vers Residence
     residence_id = Column(UUID(as_uuid=True), ForeignKey("residences.id"), nullable=False)
@@ -88,29 +99,46 @@ class Attendance(Base):
     __tablename__ = "attendances"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    start_time = Column(DateTime, nullable=False)
+    start_time = Column(DateTime, nullable=False, index=True)
     end_time = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     guard_id = Column(UUID(as_uuid=True), ForeignKey('guards.id'))
     guard = relationship("Guard", back_populates="attendances")
 
+    __table_args__ = (
+        Index("ix_attendances_guard_id_start_time", "guard_id", "start_time"),
+    )
+
 # ----------------- GUARD QR SCAN ------------------
 class GuardQRScan(Base):
     __tablename__ = "guard_qr_scans"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    # Partitionnée par mois sur scanned_at (app/partitions.py), qui fait donc
+    # partie de la clé primaire
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     qr_code_data = Column(Text, nullable=False)
     guard_id = Column(UUID(as_uuid=True), ForeignKey("guards.id"), nullable=False)
     form_data_id = Column(UUID(as_uuid=True), ForeignKey("form_data.id"), nullable=True)
+    # Copie de guard.residence_id : les requêtes par résidence évitent la jointure
+    residence_id = Column(UUID(as_uuid=True), ForeignKey("residences.id"), nullable=False)
     confirmed = Column(Boolean, nullable=True)
-    scanned_at = Column(DateTime, default=func.now(), nullable=False)
+    scanned_at = Column(DateTime, default=func.now(), primary_key=True)
     created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
 
     guard = relationship("Guard", back_populates="qr_scans")
     form_data = relationship("FormData", back_populates="guard_scans")
 
+    __table_args__ = (
+        Index("ix_guard_qr_scans_guard_id_scanned_at", "guard_id", "scanned_at"),
+        Index("ix_guard_qr_scans_form_data_id", "form_data_id"),
+        Index("ix_guard_qr_scans_residence_id_scanned_at", "residence_id", "scanned_at"),
+        Index("ix_guard_qr_scans_scanned_at_brin", "scanned_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (scanned_at)"},
+    )
+
 # ----------------- OWNER ------------------
 class Owner(Base):
     __tablename__ = "owners"
@@ -121,6 +149,7 @@ class Owner(Base):
     email = Column(String(255), nullable=True)
     password = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     logo_path = Column(String(255), nullable=True)
 
     # Foreign key vers Residence
@@ -129,6 +158,23 @@ class Owner(Base):
 
     reports = relationship("Report", back_populates="owner")
 
+# ----------------- REFRESH TOKEN ------------------
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # Seule l'empreinte SHA-256 du jeton est stockée
+    token_hash = Column(String(64), nullable=False, unique=True)
+    # Tous les jetons issus d'une même connexion partagent la même famille
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    principal_type = Column(String(20), nullable=False)
+    principal_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    device_name = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by_id = Column(UUID(as_uuid=True), ForeignKey("refresh_tokens.id"), nullable=True)
+
 # ----------------- REPORT ------------------
 class ReportTypeEnum(str, Enum):
     USER_REPORT = "user_report"
@@ -147,6 +193,11 @@ class Report(Base):
     owner_id = Column(UUID(as_uuid=True), ForeignKey("owners.id"), nullable=False)
     residence_id = Column(UUID(as_uuid=True), ForeignKey("residences.id"), nullable=False) 
 
+    # Clé de contenu : propriétaire, type, titre, période demandée et watermark des données
+    cache_key = Column(String(64), nullable=True, index=True)
+    date_from = Column(DateTime, nullable=True)
+    date_to = Column(DateTime, nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     owner = relationship("Owner", back_populates="reports")
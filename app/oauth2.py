@@ -1,20 +1,35 @@
-from uuid import UUID
-from fastapi import HTTPException, status, Depends
-from jose import jwt, JWTError
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from uuid import UUID, uuid4
+from fastapi import HTTPException, Request, status, Depends
+import jwt
+from jwt import InvalidTokenError
 from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.models.data import Guard, Owner, User
+from app.models.data import Guard, Owner, RefreshToken, User
 from app.schemas.token import TokenData
 from app.postgres_connect import get_db
+from app.tracing import span
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
+
+PRINCIPAL_MODELS = {"user": User, "guard": Guard, "owner": Owner}
+
+# Cache LRU des jetons déjà validés : clé = jeton brut, valeur = (exp, claims).
+# Une entrée n'est jamais servie au-delà de l'expiration du jeton.
+_token_cache: "OrderedDict[str, tuple[float, TokenData]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -26,85 +41,176 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_access_token(token: str, credentials_exception: HTTPException):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        user_name = payload.get("user_name")
-        guard_id = payload.get("guard_id")
-        guard_name = payload.get("guard_name")
-
-        if user_id is None and guard_id is None:
-            raise credentials_exception
-
-        try:
-            user_id = UUID(user_id) if user_id and user_id != "None" else None
-            guard_id = UUID(guard_id) if guard_id and guard_id != "None" else None
-        except ValueError:
-            raise credentials_exception
-
-        token_data = TokenData(id=user_id, user_name=user_name, guard_id=guard_id, guard_name=guard_name)
-        return token_data
-    except JWTError:
-        raise credentials_exception
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def issue_refresh_token(db: Session, principal_type: str, principal_id: UUID,
+                        family_id: UUID | None = None, device_name: str | None = None) -> tuple[str, RefreshToken]:
+    """Crée un jeton de rafraîchissement ; le commit est à la charge de l'appelant."""
+    raw_token = secrets.token_urlsafe(48)
+    refresh_token = RefreshToken(
+        token_hash=_hash_refresh_token(raw_token),
+        family_id=family_id or uuid4(),
+        principal_type=principal_type,
+        principal_id=principal_id,
+        device_name=device_name,
+        expires_at=datetime.now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(refresh_token)
+    db.flush()
+    return raw_token, refresh_token
+
+def revoke_refresh_token_family(db: Session, family_id: UUID):
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at == None
+    ).update({RefreshToken.revoked_at: datetime.now()}, synchronize_session=False)
+
+def rotate_refresh_token(db: Session, raw_token: str) -> tuple[str, RefreshToken]:
+    """Échange un jeton de rafraîchissement contre un nouveau de la même famille.
+
+    Un jeton déjà utilisé qui est présenté à nouveau signale un vol probable :
+    toute la famille est alors révoquée.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
+        detail="Jeton de rafraîchissement invalide ou expiré",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token_data = verify_access_token(token, credentials_exception)
+    current = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == _hash_refresh_token(raw_token)
+    ).with_for_update().first()
 
-    if token_data.id is None:
+    if current is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == token_data.id).first()
-
-    if user is None:
+    if current.revoked_at is not None:
+        revoke_refresh_token_family(db, current.family_id)
+        db.commit()
         raise credentials_exception
 
-    return user
-
-def get_current_guard(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    token_data = verify_access_token(token, credentials_exception)
-
-    if token_data.guard_id is None:
+    if current.expires_at <= datetime.now():
         raise credentials_exception
 
-    guard = db.query(Guard).filter(Guard.id == token_data.guard_id).first()
+    new_raw_token, new_token = issue_refresh_token(
+        db, current.principal_type, current.principal_id,
+        family_id=current.family_id, device_name=current.device_name
+    )
+    current.revoked_at = datetime.now()
+    current.replaced_by_id = new_token.id
+    return new_raw_token, new_token
+
+def revoke_refresh_token(db: Session, raw_token: str) -> bool:
+    current = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == _hash_refresh_token(raw_token)
+    ).first()
+    if current is None:
+        return False
+    revoke_refresh_token_family(db, current.family_id)
+    return True
+
+def revoke_principal_refresh_tokens(db: Session, principal_type: str, principal_id: UUID):
+    """Révoque toutes les sessions d'un compte (changement ou réinitialisation
+    du mot de passe) ; le commit est à la charge de l'appelant."""
+    db.query(RefreshToken).filter(
+        RefreshToken.principal_type == principal_type,
+        RefreshToken.principal_id == principal_id,
+        RefreshToken.revoked_at == None
+    ).update({RefreshToken.revoked_at: datetime.now()}, synchronize_session=False)
+
+def _parse_uuid(value):
+    return UUID(value) if value and value != "None" else None
+
+def _token_data_from_claims(payload: dict) -> TokenData:
+    return TokenData(
+        id=_parse_uuid(payload.get("user_id")),
+        user_name=payload.get("user_name"),
+        guard_id=_parse_uuid(payload.get("guard_id")),
+        guard_name=payload.get("guard_name"),
+        owner_id=_parse_uuid(payload.get("owner_id")),
+        owner_name=payload.get("owner_name"),
+        residence_id=_parse_uuid(payload.get("residence_id")),
+    )
 
-    if guard is None:
-        raise credentials_exception
+def decode_access_token(token: str) -> TokenData:
+    """Vérifie la signature et l'expiration, puis met les claims en cache.
+
+    Lève InvalidTokenError ou ValueError si le jeton est invalide.
+    """
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            exp, token_data = cached
+            if exp > now:
+                _token_cache.move_to_end(token)
+                return token_data
+            del _token_cache[token]
+
+    with span("jwt.decode"):
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    token_data = _token_data_from_claims(payload)
 
-    return guard
+    exp = payload.get("exp")
+    if exp is not None and settings.token_cache_size > 0:
+        with _token_cache_lock:
+            _token_cache[token] = (float(exp), token_data)
+            _token_cache.move_to_end(token)
+            while len(_token_cache) > settings.token_cache_size:
+                _token_cache.popitem(last=False)
 
+    return token_data
 
-def get_current_owner(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Owner:
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        owner_id: str = payload.get("owner_id")
-        if owner_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    owner = db.query(Owner).filter(Owner.id == owner_id).first()
-    if owner is None:
-        raise credentials_exception
-    return owner
-
+def get_token_data(request: Request, token: str = Depends(oauth2_scheme)) -> TokenData:
+    """Décode le jeton une seule fois par requête et le garde sur request.state."""
+    token_data = getattr(request.state, "token_data", None)
+    if token_data is not None:
+        return token_data
 
+    try:
+        token_data = decode_access_token(token)
+    except (InvalidTokenError, ValueError):
+        raise credentials_exception()
+
+    request.state.token_data = token_data
+    return token_data
+
+def resolve_principal(request: Request, db: Session, principal_type: str, principal_id: UUID | None):
+    """Charge le compte authentifié ; le résultat est partagé par toutes les
+    dépendances (et middlewares) de la requête."""
+    if principal_id is None:
+        raise credentials_exception()
+
+    principal = getattr(request.state, "principal", None)
+    if principal is not None and request.state.principal_type == principal_type:
+        return principal
+
+    model = PRINCIPAL_MODELS[principal_type]
+    with span("principal.lookup", principal_type=principal_type):
+        principal = db.get(model, principal_id)
+    if principal is None:
+        raise credentials_exception()
+
+    request.state.principal = principal
+    request.state.principal_type = principal_type
+    return principal
+
+def get_current_user(request: Request, token_data: TokenData = Depends(get_token_data),
+                     db: Session = Depends(get_db)) -> User:
+    return resolve_principal(request, db, "user", token_data.id)
+
+def get_current_guard(request: Request, token_data: TokenData = Depends(get_token_data),
+                      db: Session = Depends(get_db)) -> Guard:
+    return resolve_principal(request, db, "guard", token_data.guard_id)
+
+def get_current_owner(request: Request, token_data: TokenData = Depends(get_token_data),
+                      db: Session = Depends(get_db)) -> Owner:
+    return resolve_principal(request, db, "owner", token_data.owner_id)
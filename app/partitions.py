@@ -0,0 +1,109 @@
+"""Partitions mensuelles de guard_qr_scans.
+
+La table est partitionnée par mois sur scanned_at (migration a5d8f3c1e947) :
+les requêtes bornées dans le temps (historique, statistiques du jour,
+rapports) ne lisent que les mois concernés. Les partitions à venir sont
+créées au démarrage ; les plus anciennes peuvent être détachées (elles
+restent des tables ordinaires, à archiver avec pg_dump puis supprimer).
+
+Usage :
+    python -m app.partitions list
+    python -m app.partitions ensure --months-ahead 6
+    python -m app.partitions detach --before 2024-01-01 [--drop]
+"""
+import argparse
+import re
+from datetime import date
+
+from sqlalchemy import text
+
+from app.config import settings
+
+PARENT = "guard_qr_scans"
+PARTITION_NAME = re.compile(r"^guard_qr_scans_(\d{4})_(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partitions(connection, start: date, end: date) -> list[str]:
+    """Crée (si besoin) les partitions des mois de start à end inclus."""
+    names = []
+    month = month_start(start)
+    while month <= end:
+        names.append(connection.execute(text("SELECT guard_qr_scans_create_partition(:month)"),
+                                        {"month": month}).scalar_one())
+        month = add_months(month, 1)
+    return names
+
+
+def ensure_future_partitions(engine, months_ahead: int | None = None) -> list[str]:
+    months_ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+    today = date.today()
+    with engine.begin() as connection:
+        return create_partitions(connection, today, add_months(today, months_ahead))
+
+
+def list_partitions(connection) -> list[tuple[str, str]]:
+    rows = connection.execute(text("""
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = CAST(:parent AS regclass)
+        ORDER BY child.relname
+    """), {"parent": PARENT})
+    return [(name, bound) for name, bound in rows]
+
+
+def detach_partitions_before(connection, before: date, drop: bool = False) -> list[str]:
+    """Détache les partitions mensuelles antérieures au mois de `before`.
+
+    Leurs scans disparaissent de l'historique, des statistiques et des
+    rapports ; sans --drop, les tables détachées restent consultables.
+    """
+    limit = month_start(before)
+    detached = []
+    for name, _ in list_partitions(connection):
+        match = PARTITION_NAME.match(name)
+        if not match or date(int(match[1]), int(match[2]), 1) >= limit:
+            continue
+        connection.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION "{name}"'))
+        if drop:
+            connection.execute(text(f'DROP TABLE "{name}"'))
+        detached.append(name)
+    return detached
+
+
+def main(args):
+    from app.postgres_connect import init_engine
+
+    engine = init_engine()
+    if args.command == "ensure":
+        for name in ensure_future_partitions(engine, args.months_ahead):
+            print(name)
+    elif args.command == "list":
+        with engine.connect() as connection:
+            for name, bound in list_partitions(connection):
+                print(f"{name:<28} {bound}")
+    else:
+        with engine.begin() as connection:
+            for name in detach_partitions_before(connection, args.before, args.drop):
+                print(f"{'supprimée' if args.drop else 'détachée'} : {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    ensure = commands.add_parser("ensure")
+    ensure.add_argument("--months-ahead", type=int, default=None)
+    detach = commands.add_parser("detach")
+    detach.add_argument("--before", type=date.fromisoformat, required=True)
+    detach.add_argument("--drop", action="store_true", help="supprimer les tables détachées")
+    main(parser.parse_args())
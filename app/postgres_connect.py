@@ -7,15 +7,50 @@ from app.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.postgres_database_url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Le moteur est créé au démarrage (lifespan) ou à la première session, pas à l'import
+engine = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+def pool_options() -> dict:
+    """Part du budget de connexions revenant à ce worker.
+
+    Un quart de la part sert de débordement (max_overflow), le reste reste
+    ouvert dans le pool.
+    """
+    workers = max(1, settings.web_workers or 1)
+    per_worker = max(2, settings.db_connection_budget // workers)
+    max_overflow = per_worker // 4
+    return {
+        "pool_size": per_worker - max_overflow,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+
+def init_engine():
+    global engine
+    if engine is None:
+        engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options())
+        SessionLocal.configure(bind=engine)
+    return engine
+
+
+def dispose_engine():
+    global engine
+    if engine is not None:
+        engine.dispose()
+        engine = None
 
 
 # Dependency
 def get_db():
+    if engine is None:
+        init_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
-
@@ -0,0 +1,208 @@
+import cProfile
+import functools
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:  # pyinstrument est optionnel : cProfile sinon
+    _Pyinstrument = None
+
+PROFILE_HEADER = "x-profile"
+
+
+class _Profiler:
+    """pyinstrument (échantillonnage, rapport HTML) si installé, sinon cProfile."""
+
+    def __init__(self, async_mode: str = "disabled"):
+        if _Pyinstrument is not None:
+            self._profiler = _Pyinstrument(async_mode=async_mode)
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if _Pyinstrument is not None:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self):
+        if _Pyinstrument is not None:
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def write(self, directory: str, name: str):
+        if _Pyinstrument is not None:
+            with open(os.path.join(directory, f"{name}.html"), "w", encoding="utf-8") as output:
+                output.write(self._profiler.output_html())
+            with open(os.path.join(directory, f"{name}.txt"), "w", encoding="utf-8") as output:
+                output.write(self._profiler.output_text(unicode=True))
+            return
+
+        # .prof lisible avec snakeviz ou pstats ; .txt : 50 fonctions les plus coûteuses
+        self._profiler.dump_stats(os.path.join(directory, f"{name}.prof"))
+        text = io.StringIO()
+        pstats.Stats(self._profiler, stream=text).sort_stats("cumulative").print_stats(50)
+        with open(os.path.join(directory, f"{name}.txt"), "w", encoding="utf-8") as output:
+            output.write(text.getvalue())
+
+
+class ProfileSession:
+    def __init__(self, profile_id: str):
+        self.profile_id = profile_id
+        self.thread_id = threading.get_ident()
+        self.thread_profilers: list[tuple[str, _Profiler]] = []
+        self._lock = threading.Lock()
+
+    def add_thread_profile(self, label: str, profiler: _Profiler):
+        with self._lock:
+            self.thread_profilers.append((f"{label}-{len(self.thread_profilers)}", profiler))
+
+
+_current_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+def profiled_in_thread(label: str):
+    """Profile aussi une route synchrone, exécutée hors de la boucle d'événements.
+
+    Le profileur du middleware ne voit que le thread de la boucle ; les routes
+    synchrones (génération de rapports...) tournent dans le threadpool.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            session = _current_session.get()
+            if session is None or threading.get_ident() == session.thread_id:
+                return func(*args, **kwargs)
+
+            profiler = _Profiler()
+            try:
+                profiler.start()
+            except ValueError:
+                # Python 3.12+ : un seul cProfile actif à la fois dans le processus
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.stop()
+                session.add_thread_profile(label, profiler)
+
+        return wrapper
+
+    return decorator
+
+
+def _requested_token(scope: Scope) -> Optional[str]:
+    # En-tête uniquement : un jeton dans l'URL finirait dans les journaux
+    # d'accès, l'historique du navigateur et les en-têtes Referer
+    return Headers(scope=scope).get(PROFILE_HEADER)
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", value).strip("-")[:80] or "root"
+
+
+class ProfilingMiddleware:
+    """Profile une requête à la demande (en-tête X-Profile: <jeton>).
+
+    Désactivé par défaut ; le jeton PROFILING_TOKEN est réservé aux
+    administrateurs. Une seule requête profilée à la fois par worker : les
+    autres passent normalement. Écrit le profil CPU et un instantané
+    tracemalloc dans PROFILING_DIR/<id>/.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._busy = False
+
+    def _authorized(self, scope: Scope) -> bool:
+        if not settings.profiling_enabled or not settings.profiling_token:
+            return False
+        token = _requested_token(scope)
+        return token is not None and hmac.compare_digest(token.encode(), settings.profiling_token.encode())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self._busy or not self._authorized(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        profile_id = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{scope['method']}-{_slug(scope['path'])}"
+        session = ProfileSession(profile_id)
+        token = _current_session.set(session)
+        status_code = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(settings.profiling_tracemalloc_frames)
+        profiler = _Profiler(async_mode="enabled")
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracemalloc:
+                tracemalloc.stop()
+            _current_session.reset(token)
+
+            summary = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status_code,
+                "duration_ms": duration * 1000,
+                "traced_memory_current_bytes": current,
+                "traced_memory_peak_bytes": peak,
+                "profiler": "pyinstrument" if _Pyinstrument is not None else "cProfile",
+            }
+            try:
+                await run_in_threadpool(self._write, session, profiler, snapshot, summary)
+            finally:
+                self._busy = False
+
+    @staticmethod
+    def _write(session: ProfileSession, profiler: _Profiler, snapshot, summary: dict):
+        directory = os.path.join(settings.profiling_dir, session.profile_id)
+        os.makedirs(directory, exist_ok=True)
+
+        profiler.write(directory, "request")
+        for label, thread_profiler in session.thread_profilers:
+            thread_profiler.write(directory, f"thread-{label}")
+
+        # Instantané complet (comparable avec tracemalloc.Snapshot.load) et top 50 par ligne
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        snapshot.dump(os.path.join(directory, "tracemalloc.snapshot"))
+        with open(os.path.join(directory, "tracemalloc.txt"), "w", encoding="utf-8") as output:
+            for stat in snapshot.statistics("lineno")[:50]:
+                output.write(f"{stat}\n")
+
+        with open(os.path.join(directory, "summary.json"), "w", encoding="utf-8") as output:
+            json.dump(summary, output, indent=2)
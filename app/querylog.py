@@ -0,0 +1,182 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+logger = logging.getLogger("app.queries")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Levée en mode strict quand une requête HTTP dépasse son budget SQL."""
+
+
+class QueryTracker:
+    """Requêtes SQL exécutées pendant une requête HTTP."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter[str] = Counter()
+        self.budget: Optional[int] = None
+
+    def before_execute(self, statement: str):
+        if not settings.query_strict:
+            return
+        # Vérifié avant l'exécution : la requête fautive n'est jamais envoyée
+        if self.budget is not None and self.count >= self.budget:
+            raise QueryBudgetExceeded(
+                f"Budget de {self.budget} requêtes SQL dépassé ; requête suivante : {statement[:200]}"
+            )
+        if self.statements[statement] + 1 >= settings.query_repeat_threshold:
+            raise QueryBudgetExceeded(
+                f"N+1 probable : {settings.query_repeat_threshold} exécutions de {statement[:200]}"
+            )
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self) -> list[tuple[str, int]]:
+        return [(statement, count) for statement, count in self.statements.most_common()
+                if count >= settings.query_repeat_threshold]
+
+
+_current_tracker: ContextVar[Optional[QueryTracker]] = ContextVar("query_tracker", default=None)
+
+
+def current_tracker() -> Optional[QueryTracker]:
+    return _current_tracker.get()
+
+
+@contextmanager
+def tracking():
+    """Réutilise le suivi de la requête en cours ou en démarre un."""
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        yield tracker
+        return
+
+    tracker = QueryTracker()
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+def redact(parameters):
+    # Seuls les noms et les types des paramètres sont journalisés, jamais les
+    # valeurs (numéros de téléphone, hachages, QR codes...)
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"<{len(parameters)} lignes>"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+# Suivis branchés sur le chronométrage ci-dessous (métriques, traçage) : une
+# seule pile par connexion, dépilée aussi quand la requête échoue
+_observers: list[tuple[Optional[Callable], Callable]] = []
+
+
+def observe_statements(finished: Callable, started: Optional[Callable] = None):
+    """Abonne un suivi à chaque requête SQL exécutée.
+
+    started(statement, executemany) est appelé avant l'exécution ; sa valeur
+    est rendue à finished(state, elapsed, rowcount, error), appelé après, y
+    compris en cas d'échec (rowcount vaut alors None et error l'exception).
+    """
+    _observers.append((started, finished))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.before_execute(statement)
+    states = [started(statement, executemany) if started else None for started, _ in _observers]
+    conn.info.setdefault("query_start_time", []).append((time.perf_counter(), states))
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start, states = conn.info["query_start_time"].pop()
+    elapsed = time.perf_counter() - start
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.record(statement, elapsed)
+
+    if elapsed * 1000 >= settings.slow_query_ms:
+        logger.warning("Requête lente (%.0f ms) : %s | paramètres : %s",
+                       elapsed * 1000, " ".join(statement.split()), redact(parameters))
+
+    for (_, finished), state in zip(_observers, states):
+        finished(state, elapsed, cursor.rowcount, None)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Requête en échec : after_cursor_execute n'est pas appelé
+    connection = exception_context.connection
+    starts = connection.info.get("query_start_time") if connection is not None else None
+    if not starts:
+        return
+    start, states = starts.pop()
+    elapsed = time.perf_counter() - start
+    for (_, finished), state in zip(_observers, states):
+        finished(state, elapsed, None, exception_context.original_exception)
+
+
+def query_budget(max_queries: int):
+    """Dépendance de route déclarant le nombre maximal de requêtes SQL attendu.
+
+    Le dépassement est journalisé ; en mode strict (QUERY_STRICT, pour les
+    tests) la requête échoue.
+    """
+    def dependency():
+        tracker = current_tracker()
+        if tracker is not None:
+            tracker.budget = max_queries
+
+    return Depends(dependency)
+
+
+class QueryLogMiddleware:
+    """Compte les requêtes SQL de chaque requête HTTP et signale les N+1."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with tracking() as tracker:
+            async def send_wrapper(message: Message):
+                if message["type"] == "http.response.start" and settings.query_count_header:
+                    MutableHeaders(scope=message)["X-Query-Count"] = str(tracker.count)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+            path = getattr(scope.get("route"), "path", scope["path"])
+            for statement, count in tracker.repeated():
+                logger.warning("N+1 probable sur %s %s : %d exécutions de %s",
+                               scope["method"], path, count, " ".join(statement.split())[:300])
+            if tracker.budget is not None and tracker.count > tracker.budget:
+                logger.warning("Budget SQL dépassé sur %s %s : %d requêtes pour un budget de %d",
+                               scope["method"], path, tracker.count, tracker.budget)
@@ -0,0 +1,209 @@
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.config import settings
+
+
+class MemoryBackend:
+    """Fenêtres glissantes en mémoire, propres à chaque worker."""
+
+    # Nettoyage des clés expirées toutes les N opérations
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._events: dict[str, deque] = {}
+        self._windows: dict[str, float] = {}
+        self._lockouts: dict[str, float] = {}
+        self._levels: dict[str, tuple[int, float]] = {}
+        self._operations = 0
+
+    def _sweep(self, now: float):
+        for key in [k for k, events in self._events.items() if not events or events[-1] <= now - self._windows[k]]:
+            self._events.pop(key, None)
+            self._windows.pop(key, None)
+        for key in [k for k, until in self._lockouts.items() if until <= now]:
+            del self._lockouts[key]
+        for key in [k for k, (_, expires) in self._levels.items() if expires <= now]:
+            del self._levels[key]
+
+    async def hit(self, key: str, window: int) -> int:
+        now = time.monotonic()
+        async with self._lock:
+            self._operations += 1
+            if self._operations % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+
+            events = self._events.setdefault(key, deque())
+            self._windows[key] = window
+            events.append(now)
+            while events and events[0] <= now - window:
+                events.popleft()
+            return len(events)
+
+    async def clear(self, key: str):
+        async with self._lock:
+            self._events.pop(key, None)
+            self._windows.pop(key, None)
+
+    async def locked_for(self, key: str) -> int:
+        until = self._lockouts.get(key)
+        if until is None:
+            return 0
+        return max(0, int(until - time.monotonic() + 0.999))
+
+    async def lock(self, key: str, base_seconds: int, max_seconds: int) -> int:
+        now = time.monotonic()
+        async with self._lock:
+            level, expires = self._levels.get(key, (0, 0.0))
+            level = level + 1 if expires > now else 1
+            duration = min(base_seconds * 2 ** (level - 1), max_seconds)
+            self._levels[key] = (level, now + duration + max_seconds)
+            self._lockouts[key] = now + duration
+            return duration
+
+
+class RedisBackend:
+    """Fenêtres glissantes partagées entre workers et hôtes. Nécessite redis."""
+
+    def __init__(self, url: str, prefix: str = "welqo:ratelimit:"):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError("Le paquet redis est requis pour RATE_LIMIT_BACKEND=redis") from e
+
+        self.redis = aioredis.from_url(url)
+        self.prefix = prefix
+
+    async def hit(self, key, window):
+        now = time.time()
+        redis_key = f"{self.prefix}events:{key}"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(redis_key, "-inf", now - window)
+            pipe.zadd(redis_key, {f"{now:.6f}": now})
+            pipe.zcard(redis_key)
+            pipe.expire(redis_key, window)
+            _, _, count, _ = await pipe.execute()
+        return count
+
+    async def clear(self, key):
+        await self.redis.delete(f"{self.prefix}events:{key}")
+
+    async def locked_for(self, key):
+        ttl = await self.redis.ttl(f"{self.prefix}lock:{key}")
+        return max(0, ttl)
+
+    async def lock(self, key, base_seconds, max_seconds):
+        level_key = f"{self.prefix}level:{key}"
+        level = await self.redis.incr(level_key)
+        duration = min(base_seconds * 2 ** (level - 1), max_seconds)
+        await self.redis.expire(level_key, duration + max_seconds)
+        await self.redis.set(f"{self.prefix}lock:{key}", 1, ex=duration)
+        return duration
+
+
+@lru_cache
+def get_rate_limit_backend():
+    if settings.rate_limit_backend == "redis":
+        return RedisBackend(settings.redis_url)
+    return MemoryBackend()
+
+
+def client_ip(request: Request) -> str:
+    if settings.trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class Throttle:
+    """Limite les tentatives par numéro de téléphone et par IP.
+
+    Au-delà du quota d'une fenêtre glissante, la clé est bloquée pendant une
+    durée qui double à chaque récidive. Le contrôle a lieu avant tout hachage.
+    """
+
+    def __init__(self, scope: str, phone_number: Optional[str], ip: str,
+                 max_per_phone: int, max_per_ip: int, window_seconds: int):
+        self.backend = get_rate_limit_backend()
+        self.limits = {f"{scope}:ip:{ip}": max_per_ip}
+        # Sans numéro, seule la limite par IP s'applique : un compteur commun
+        # "phone:" laisserait un client bloquer les requêtes de tous les autres
+        phone_number = (phone_number or "").strip()
+        self.phone_key = f"{scope}:phone:{phone_number}" if phone_number else None
+        if self.phone_key:
+            self.limits[self.phone_key] = max_per_phone
+        self.window_seconds = window_seconds
+
+    async def check(self):
+        retry_after = 0
+        for key in self.limits:
+            retry_after = max(retry_after, await self.backend.locked_for(key))
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Trop de tentatives. Veuillez réessayer dans {retry_after} secondes.",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    async def record(self):
+        for key, limit in self.limits.items():
+            if await self.backend.hit(key, self.window_seconds) >= limit:
+                await self.backend.lock(key, settings.lockout_base_seconds, settings.lockout_max_seconds)
+                await self.backend.clear(key)
+
+    async def reset(self):
+        # Seul le compteur du numéro est remis à zéro : une connexion réussie
+        # ne doit pas effacer les échecs d'une IP qui en essaie d'autres
+        if self.phone_key:
+            await self.backend.clear(self.phone_key)
+
+
+def login_throttle(role: str):
+    async def dependency(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> Throttle:
+        throttle = Throttle(
+            f"login:{role}",
+            form_data.username,
+            client_ip(request),
+            max_per_phone=settings.login_max_attempts_per_phone,
+            max_per_ip=settings.login_max_attempts_per_ip,
+            window_seconds=settings.login_window_seconds,
+        )
+        await throttle.check()
+        return throttle
+
+    return dependency
+
+
+def password_reset_throttle(role: str, step: str):
+    # Chaque appel compte, qu'il aboutisse ou non. Un compteur par étape
+    # ("forgot", "reset") : la vérification du numéro ne consomme pas les
+    # tentatives de la réinitialisation qui la suit
+    async def dependency(request: Request):
+        phone_number: Optional[str] = None
+        try:
+            body = await request.json()
+            if isinstance(body, dict):
+                phone_number = str(body.get("phone_number") or "")
+        except ValueError:
+            pass
+
+        throttle = Throttle(
+            f"password-{step}:{role}",
+            phone_number,
+            client_ip(request),
+            max_per_phone=settings.password_reset_max_attempts_per_phone,
+            max_per_ip=settings.password_reset_max_attempts_per_ip,
+            window_seconds=settings.password_reset_window_seconds,
+        )
+        await throttle.check()
+        await throttle.record()
+
+    return dependency
@@ -5,29 +5,53 @@ from datetime import datetime, timedelta
 from typing import Annotated
 
 from app.config import settings
-from app.oauth2 import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, get_current_guard
+from app.oauth2 import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    PRINCIPAL_MODELS,
+    create_access_token,
+    get_current_guard,
+    issue_refresh_token,
+    revoke_refresh_token,
+    rotate_refresh_token,
+)
 from app.postgres_connect import get_db
+from app.ratelimit import Throttle, login_throttle
 from app.models.data import Attendance, Owner, User, Guard
-from app.schemas.token import Token
-from app.utils import verify
+from app.schemas.token import RefreshTokenRequest, Token
+from app.utils import verify_and_rehash_async
 
 router = APIRouter(tags=["Authentication"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
+async def check_password(db: Session, account, password: str) -> bool:
+    if not account:
+        return False
+
+    valid, new_hash = await verify_and_rehash_async(password, account.password)
+    if valid and new_hash:
+        # Hachage obsolète (schéma ou coût) : mis à jour de façon transparente
+        account.password = new_hash
+        db.commit()
+    return valid
+
+
 @router.post("/user/login", response_model=Token)
 async def login_user(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    throttle: Annotated[Throttle, Depends(login_throttle("user"))],
     db: Session = Depends(get_db)
 ):
     user = db.query(User).filter(User.phone_number == form_data.username).first()
-    if not user or not verify(form_data.password, user.password):
+    if not await check_password(db, user, form_data.password):
+        await throttle.record()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nom d'utilisateur ou mot de passe incorrect",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await throttle.reset()
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -39,26 +63,34 @@ async def login_user(
         expires_delta=access_token_expires
     )
 
+    # Jeton longue durée : le client renouvelle son accès sans ressaisir le mot de passe
+    refresh_token, _ = issue_refresh_token(db, "user", user.id, device_name=form_data.client_id)
+    db.commit()
+
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user_name": user.name,
-        "residence_id": str(user.residence_id)  # ✅ Ajouté dans la réponse
+        "residence_id": str(user.residence_id),  # ✅ Ajouté dans la réponse
+        "refresh_token": refresh_token
     }
 
 
 @router.post("/guard/login", response_model=Token)
 async def login_guard(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    throttle: Annotated[Throttle, Depends(login_throttle("guard"))],
     db: Session = Depends(get_db)
 ):
     guard = db.query(Guard).filter(Guard.phone_number == form_data.username).first()
-    if not guard or not verify(form_data.password, guard.password):
+    if not await check_password(db, guard, form_data.password):
+        await throttle.record()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nom d'utilisateur ou mot de passe incorrect",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await throttle.reset()
 
     # Enregistre l'heure de début de session
     attendance = Attendance(
@@ -78,11 +110,16 @@ async def login_guard(
         expires_delta=access_token_expires
     )
 
+    # Jeton longue durée : le client renouvelle son accès sans ressaisir le mot de passe
+    refresh_token, _ = issue_refresh_token(db, "guard", guard.id, device_name=form_data.client_id)
+    db.commit()
+
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user_name": guard.name,
-        "residence_id": str(guard.residence_id)  # ✅ Ajouté dans la réponse
+        "residence_id": str(guard.residence_id),  # ✅ Ajouté dans la réponse
+        "refresh_token": refresh_token
     }
 
 
@@ -106,15 +143,18 @@ async def logout_guard(
 @router.post("/owner/login", response_model=Token)
 async def login_owner(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    throttle: Annotated[Throttle, Depends(login_throttle("owner"))],
     db: Session = Depends(get_db)
 ):
     owner = db.query(Owner).filter(Owner.phone_number == form_data.username).first()
-    if not owner or not verify(form_data.password, owner.password):
+    if not await check_password(db, owner, form_data.password):
+        await throttle.record()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nom d'utilisateur ou mot de passe incorrect",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await throttle.reset()
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -126,9 +166,56 @@ async def login_owner(
         expires_delta=access_token_expires
     )
 
+    # Jeton longue durée : le client renouvelle son accès sans ressaisir le mot de passe
+    refresh_token, _ = issue_refresh_token(db, "owner", owner.id, device_name=form_data.client_id)
+    db.commit()
+
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user_name": owner.name,
-        "residence_id": str(owner.residence_id)  # ✅ déjà présent
+        "residence_id": str(owner.residence_id),  # ✅ déjà présent
+        "refresh_token": refresh_token
     }
+
+
+@router.post("/token/refresh", response_model=Token)
+def refresh_access_token(payload: RefreshTokenRequest, db: Session = Depends(get_db)):
+    # Ni hachage de mot de passe ni pointage : seule la connexion d'un gardien
+    # ouvre une période de présence
+    refresh_token, token_row = rotate_refresh_token(db, payload.refresh_token)
+
+    model = PRINCIPAL_MODELS[token_row.principal_type]
+    account = db.query(model).filter(model.id == token_row.principal_id).first()
+    if account is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Jeton de rafraîchissement invalide ou expiré",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    db.commit()
+
+    access_token = create_access_token(
+        data={
+            f"{token_row.principal_type}_id": str(account.id),
+            f"{token_row.principal_type}_name": account.name,
+            "residence_id": str(account.residence_id)
+        },
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user_name": account.name,
+        "residence_id": str(account.residence_id),
+        "refresh_token": refresh_token
+    }
+
+
+@router.post("/token/revoke")
+def revoke_token(payload: RefreshTokenRequest, db: Session = Depends(get_db)):
+    if revoke_refresh_token(db, payload.refresh_token):
+        db.commit()
+    return {"message": "Session révoquée"}
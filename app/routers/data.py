@@ -2,9 +2,10 @@ from typing import Annotated, List
 from datetime import datetime, timedelta
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status, HTTPException, Query
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
 
+from app.caching import check_not_modified, make_etag
 from app.oauth2 import get_current_user
 from app.schemas.data import (
     FormDataCreate,
@@ -17,8 +18,14 @@ from app.schemas.data import (
 )
 from app.models.data import FormData
 from app.postgres_connect import get_db
+from app.serialization import fast_list_response
+from app.fieldsets import FieldsQuery, load_columns, parse_fields, subset_model
+from app.querylog import query_budget
+from app.batch import BatchIds, batch_response, id_in, unique_ids
+from app.schemas.batch import BatchOut
 from app.utils import generate_qr_code_base64, generate_qr_content
 from app.models.data import User
+from app.schemas.user import UserOut
 
 router = APIRouter(prefix="/forms", tags=["Form Data"])
 
@@ -55,7 +62,8 @@ async def create_form_data(
         qr_code_data=qr_code_base64,
         created_at=created_at,
         expires_at=expires_at,
-        user_id=current_user.id
+        user_id=current_user.id,
+        residence_id=current_user.residence_id
     )
 
     db.add(new_form)
@@ -65,13 +73,21 @@ async def create_form_data(
     return new_form
 
 
-@router.get("/user-forms", response_model=List[FormDataResponse])
+@router.get("/user-forms", response_model=List[FormDataResponse], dependencies=[query_budget(3)])
 async def get_user_forms(
     db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)]
+    current_user: Annotated[User, Depends(get_current_user)],
+    fields: FieldsQuery = None
 ):
-    forms = db.query(FormData).filter(FormData.user_id == current_user.id).all()
-    return forms
+    selected = parse_fields(FormDataResponse, fields)
+    # Le résident est current_user, déjà présent dans la session : pas de jointure
+    forms = (
+        db.query(FormData)
+        .options(load_columns(FormData, selected, FormData.user_id))
+        .filter(FormData.user_id == current_user.id)
+        .all()
+    )
+    return fast_list_response(subset_model(FormDataResponse, selected), forms)
 
 @router.get("/validate-qr-code", response_model=QRValidationResponse)
 async def validate_qr_code(
@@ -108,22 +124,39 @@ async def validate_qr_code(
         )
     )
 
-@router.get("/all", response_model=List[FormDataResponse])
+@router.get("/all", response_model=List[FormDataResponse], dependencies=[query_budget(3)])
 async def get_all_forms(
     db: Annotated[Session, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    fields: FieldsQuery = None
 ):
+    selected = parse_fields(FormDataResponse, fields)
+    query = db.query(FormData).options(load_columns(FormData, selected))
+    if "user" in selected:
+        query = query.options(joinedload(FormData.user).options(load_columns(User, tuple(UserOut.model_fields))))
+
     forms = (
-        db.query(FormData)
-        .options(joinedload(FormData.user))
+        query
         .filter(FormData.user_id == current_user.id)
         .offset(skip)
         .limit(limit)
         .all()
     )
-    return forms
+    return fast_list_response(subset_model(FormDataResponse, selected), forms)
+
+
+@router.get("/batch", response_model=BatchOut[FormDataResponse])
+async def get_forms_batch(
+    ids: BatchIds,
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)]
+):
+    # Même règle que GET /forms/{id} : seuls les formulaires du résident sont renvoyés
+    ids = unique_ids(ids)
+    forms = db.query(FormData).filter(id_in(FormData.id, ids), FormData.user_id == current_user.id).all()
+    return batch_response(FormDataResponse, ids, forms)
 
 
 @router.get("/{form_id}", response_model=FormDataResponse)
@@ -141,8 +174,29 @@ async def get_form(
 @router.get("/public/{form_id}", response_model=FormDataResponse)
 async def get_form_public(
     form_id: UUID,
+    request: Request,
+    response: Response,
     db: Annotated[Session, Depends(get_db)]
 ):
+    # Vérification de version sans charger le QR code ni le résident
+    versions = (
+        db.query(FormData.updated_at, User.updated_at)
+        .outerjoin(User, FormData.user_id == User.id)
+        .filter(FormData.id == form_id)
+        .first()
+    )
+    if not versions:
+        raise HTTPException(status_code=404, detail="Formulaire non trouvé")
+
+    form_updated_at, user_updated_at = versions
+    last_modified = max((v for v in versions if v is not None), default=None)
+    not_modified = check_not_modified(
+        request, response, make_etag("form", form_id, form_updated_at, user_updated_at),
+        "public_form", last_modified,
+    )
+    if not_modified:
+        return not_modified
+
     form = db.query(FormData).filter(FormData.id == form_id).first()
     if not form:
         raise HTTPException(status_code=404, detail="Formulaire non trouvé")
@@ -0,0 +1,160 @@
+import csv
+import io
+import zlib
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.models.data import Attendance, FormData, Guard, GuardQRScan, Owner, User
+from app.oauth2 import get_current_owner
+from app.postgres_connect import SessionLocal
+from app.routers.report import resolve_period
+from app.schemas.export import ExportFormat
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+# Nombre de lignes lues par aller-retour avec le curseur serveur
+EXPORT_BATCH_SIZE = 2000
+DEFAULT_EXPORT_WINDOW = timedelta(days=30)
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+SCAN_COLUMNS = [
+    "id", "scanned_at", "confirmed", "guard_name",
+    "visitor_name", "visitor_phone", "visitor_apartment", "expires_at",
+    "resident_name", "resident_phone", "resident_apartment",
+]
+
+ATTENDANCE_COLUMNS = ["id", "guard_name", "guard_phone", "start_time", "end_time"]
+
+
+def _encode_batches(rows: Iterator[list], columns: list[str], export_format: ExportFormat) -> Iterator[bytes]:
+    if export_format == ExportFormat.CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode("utf-8")
+
+        for batch in rows:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                ["" if value is None else value.isoformat() if isinstance(value, datetime) else value for value in row]
+                for row in batch
+            )
+            yield buffer.getvalue().encode("utf-8")
+    else:
+        for batch in rows:
+            yield b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in batch)
+
+
+def _gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _stream_export(stmt, columns: list[str], export_format: ExportFormat, compress: bool) -> Iterator[bytes]:
+    # La session est ouverte dans le générateur : celle de get_db est fermée
+    # avant que le corps de la réponse ne soit envoyé
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+        chunks = _encode_batches(result.partitions(), columns, export_format)
+        if compress:
+            chunks = _gzip_chunks(chunks)
+        yield from chunks
+    finally:
+        db.close()
+
+
+def _export_response(stmt, columns: list[str], name: str, export_format: ExportFormat, compress: bool):
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format.value}"
+    media_type = MEDIA_TYPES[export_format]
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        _stream_export(stmt, columns, export_format, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/scans")
+def export_scans(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    gzip: bool = False,
+    current_owner: Owner = Depends(get_current_owner)
+):
+    date_from, date_to = resolve_period(date_from, date_to, DEFAULT_EXPORT_WINDOW)
+
+    stmt = (
+        select(
+            GuardQRScan.id,
+            GuardQRScan.scanned_at,
+            GuardQRScan.confirmed,
+            Guard.name,
+            FormData.name,
+            FormData.phone_number,
+            FormData.apartment_number,
+            FormData.expires_at,
+            User.name,
+            User.phone_number,
+            User.appartement,
+        )
+        .join(Guard, GuardQRScan.guard_id == Guard.id)
+        .outerjoin(FormData, GuardQRScan.form_data_id == FormData.id)
+        .outerjoin(User, FormData.user_id == User.id)
+        .where(
+            GuardQRScan.residence_id == current_owner.residence_id,
+            GuardQRScan.scanned_at >= date_from,
+            GuardQRScan.scanned_at <= date_to
+        )
+        .order_by(GuardQRScan.scanned_at)
+    )
+
+    return _export_response(stmt, SCAN_COLUMNS, "scans", export_format, gzip)
+
+
+@router.get("/attendances")
+def export_attendances(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    gzip: bool = False,
+    current_owner: Owner = Depends(get_current_owner)
+):
+    date_from, date_to = resolve_period(date_from, date_to, DEFAULT_EXPORT_WINDOW)
+
+    stmt = (
+        select(
+            Attendance.id,
+            Guard.name,
+            Guard.phone_number,
+            Attendance.start_time,
+            Attendance.end_time,
+        )
+        .join(Guard, Attendance.guard_id == Guard.id)
+        .where(
+            Guard.residence_id == current_owner.residence_id,
+            Attendance.start_time >= date_from,
+            Attendance.start_time <= date_to
+        )
+        .order_by(Attendance.start_time)
+    )
+
+    return _export_response(stmt, ATTENDANCE_COLUMNS, "attendances", export_format, gzip)
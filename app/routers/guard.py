@@ -1,16 +1,22 @@
 from typing import Annotated, List
 from uuid import UUID
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import joinedload
 
-from app.oauth2 import get_current_guard
+from app.caching import check_not_modified, make_etag
+from app.oauth2 import get_current_guard, revoke_principal_refresh_tokens
 from app.schemas.guard import AttendanceOut, GuardAttendanceOut, GuardCreate, GuardOut, GuardQRScanOut, GuardUpdate
 from app.models.data import Guard, GuardQRScan
 from app.postgres_connect import get_db
+from app.serialization import fast_list_response
+from app.fieldsets import FieldsQuery, load_columns, parse_fields, subset_model
+from app.batch import BatchIds, batch_response, id_in, unique_ids
+from app.schemas.batch import BatchOut
+from app.ratelimit import password_reset_throttle
 from app.models.data import Residence
 from app.schemas.owner import ForgotPasswordRequest, MessageResponse, ResetPasswordRequest
-from app.utils import hashed
+from app.utils import hashed, hashed_async
 
 
 router = APIRouter(prefix="/guards", tags=["Guards"])
@@ -34,7 +40,7 @@ async def create_guard(guard: GuardCreate, db: Session = Depends(get_db)):
         )
 
     # Hachez le mot de passe avant de le stocker
-    hashed_password = hashed(guard.password)
+    hashed_password = await hashed_async(guard.password)
 
     # Créez un nouveau gardien avec association à la résidence
     new_guard = Guard(
@@ -55,31 +61,34 @@ async def create_guard(guard: GuardCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/all", response_model=List[GuardOut])
-async def get_all_guards(db: Session = Depends(get_db)):
-    guards = db.query(Guard).all()
-    return guards
+async def get_all_guards(db: Session = Depends(get_db), fields: FieldsQuery = None):
+    selected = parse_fields(GuardOut, fields)
+    guards = db.query(Guard).options(load_columns(Guard, selected)).all()
+    return fast_list_response(subset_model(GuardOut, selected), guards)
 
 
 # CORRIGÉ : Déplacé l'endpoint /profile AVANT l'endpoint /{guard_id}
 @router.get("/profile", response_model=GuardOut)
 async def get_guard_profile(
-    current_guard: Annotated[Guard, Depends(get_current_guard)],
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_guard: Annotated[Guard, Depends(get_current_guard)]
 ):
     """
     Retrieve the profile of the currently authenticated guard.
     """
-    # Récupérer les données complètes du gardien depuis la base de données
-    guard = db.query(Guard).filter(Guard.id == current_guard.id).first()
-    if not guard:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail="Profil du gardien non trouvé"
-        )
-    return guard
+    # Le gardien est déjà chargé complètement par get_current_guard
+    not_modified = check_not_modified(
+        request, response, make_etag("guard", current_guard.id, current_guard.updated_at),
+        "profile", current_guard.updated_at,
+    )
+    if not_modified:
+        return not_modified
+    return current_guard
 
 
-@router.post("/forgot-password", response_model=MessageResponse)
+@router.post("/forgot-password", response_model=MessageResponse,
+             dependencies=[Depends(password_reset_throttle("guard", "forgot"))])
 def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db)):
     # Vérifiez si le numéro de téléphone existe dans la base de données
     owner = db.query(Guard).filter(Guard.phone_number == request.phone_number).first()
@@ -88,7 +97,8 @@ def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db
 
     return {"message": "Numéro de téléphone valide. Veuillez saisir votre nouveau mot de passe."}
 
-@router.post("/reset-password", response_model=MessageResponse)
+@router.post("/reset-password", response_model=MessageResponse,
+             dependencies=[Depends(password_reset_throttle("guard", "reset"))])
 def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
     # Vérifiez si le numéro de téléphone existe dans la base de données
     owner = db.query(Guard).filter(Guard.phone_number == request.phone_number).first()
@@ -101,6 +111,7 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
 
     # Réinitialiser le mot de passe
     owner.password = hashed(request.new_password)
+    revoke_principal_refresh_tokens(db, "guard", owner.id)
     db.commit()
     db.refresh(owner)
 
@@ -108,6 +119,13 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
 
 
 
+@router.get("/batch", response_model=BatchOut[GuardOut])
+async def get_guards_batch(ids: BatchIds, db: Session = Depends(get_db)):
+    ids = unique_ids(ids)
+    guards = db.query(Guard).filter(id_in(Guard.id, ids)).all()
+    return batch_response(GuardOut, ids, guards)
+
+
 @router.get("/{guard_id}", response_model=GuardOut)
 async def get_guard(guard_id: UUID, db: Session = Depends(get_db)):
     guard = db.query(Guard).filter(Guard.id == guard_id).first()
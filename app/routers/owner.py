@@ -1,24 +1,25 @@
-import os
-import shutil
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from fastapi.responses import FileResponse
 from typing import List
 from uuid import UUID
 from app.models.data import Owner, Report
 from app.schemas.owner import ForgotPasswordRequest, MessageResponse, OwnerCreate, OwnerOut, ResetPasswordRequest
 from app.postgres_connect import get_db
+from app.serialization import fast_list_response
+from app.fieldsets import FieldsQuery, load_columns, parse_fields, subset_model
+from app.caching import check_not_modified, make_etag
+from app.ratelimit import password_reset_throttle
 from app.schemas.report import ReportOut
 from app.models.data import Residence
-from app.oauth2 import get_current_owner
+from app.oauth2 import get_current_owner, revoke_principal_refresh_tokens
+from app.downloads import stored_file_response
+from app.storage import LOGOS_PREFIX, get_storage
 from app.utils import hashed
 
 
 router = APIRouter(prefix="/owners", tags=["Owners"])
 
-LOGO_DIR = "uploaded_logos"
-os.makedirs(LOGO_DIR, exist_ok=True)
-
 @router.post("/create-owner", response_model=OwnerOut)
 def create_owner(owner: OwnerCreate, db: Session = Depends(get_db)):
     existing = db.query(Owner).filter(Owner.phone_number == owner.phone_number).first()
@@ -51,11 +52,9 @@ def upload_logo(
     current_owner: Owner = Depends(get_current_owner)
 ):
     ext = file.filename.split(".")[-1]
-    filename = f"{current_owner.id}_logo.{ext}"
-    path = os.path.join(LOGO_DIR, filename)
+    path = f"{LOGOS_PREFIX}/{current_owner.id}_logo.{ext}"
 
-    with open(path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    get_storage().save(path, file.file)
 
     current_owner.logo_path = path
     db.commit()
@@ -63,7 +62,8 @@ def upload_logo(
 
     return current_owner
 
-@router.post("/forgot-password", response_model=MessageResponse)
+@router.post("/forgot-password", response_model=MessageResponse,
+             dependencies=[Depends(password_reset_throttle("owner", "forgot"))])
 def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db)):
     # Vérifiez si le numéro de téléphone existe dans la base de données
     owner = db.query(Owner).filter(Owner.phone_number == request.phone_number).first()
@@ -72,7 +72,8 @@ def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db
 
     return {"message": "Numéro de téléphone valide. Veuillez saisir votre nouveau mot de passe."}
 
-@router.post("/reset-password", response_model=MessageResponse)
+@router.post("/reset-password", response_model=MessageResponse,
+             dependencies=[Depends(password_reset_throttle("owner", "reset"))])
 def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
     # Vérifiez si le numéro de téléphone existe dans la base de données
     owner = db.query(Owner).filter(Owner.phone_number == request.phone_number).first()
@@ -85,29 +86,46 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
 
     # Réinitialiser le mot de passe
     owner.password = hashed(request.new_password)
+    revoke_principal_refresh_tokens(db, "owner", owner.id)
     db.commit()
     db.refresh(owner)
 
     return {"message": "Mot de passe réinitialisé avec succès"}
 
 @router.get("/all", response_model=List[OwnerOut])
-def get_all_owners(db: Session = Depends(get_db)):
-    owners = db.query(Owner).all()
-    return owners
+def get_all_owners(db: Session = Depends(get_db), fields: FieldsQuery = None):
+    selected = parse_fields(OwnerOut, fields)
+    owners = db.query(Owner).options(load_columns(Owner, selected)).all()
+    return fast_list_response(subset_model(OwnerOut, selected), owners)
 
 
 
 @router.get("/my-reports", response_model=List[ReportOut])
 def get_reports_by_owner(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_owner: Owner = Depends(get_current_owner)
 ):
+    # Les rapports ne sont jamais modifiés : nombre et date du plus récent suffisent
+    count, last_created = (
+        db.query(func.count(Report.id), func.max(Report.created_at))
+        .filter(Report.owner_id == current_owner.id)
+        .one()
+    )
+    not_modified = check_not_modified(
+        request, response, make_etag("reports", current_owner.id, count, last_created), "reports", last_created
+    )
+    if not_modified:
+        return not_modified
+
     reports = db.query(Report).filter(Report.owner_id == current_owner.id).all()
     return reports
 
-@router.get("/download/{report_id}", response_class=FileResponse)
+@router.get("/download/{report_id}")
 def download_report(
     report_id: UUID,
+    request: Request,
     db: Session = Depends(get_db),
     current_owner: Owner = Depends(get_current_owner)
 ):
@@ -117,13 +135,11 @@ def download_report(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, 
                             detail="Rapport non trouvé ou accès non autorisé.")
 
-    if not os.path.exists(report.file_path):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                             detail="Fichier PDF introuvable sur le serveur.")
-
-    return FileResponse(
-        path=report.file_path,
-        filename=os.path.basename(report.file_path),
+    return stored_file_response(
+        request,
+        get_storage(),
+        report.file_path,
+        filename=f"{report.title.replace(' ', '_')}.pdf",
         media_type='application/pdf'
     )
 
@@ -13,19 +13,64 @@ from app.schemas.qrcode import (
     QRConfirmRequest,
     QRConfirmResponse
 )
-from app.models.data import FormData, Guard, GuardQRScan
+from app.models.data import FormData, Guard, GuardQRScan, User
 from app.postgres_connect import get_db
 from app.oauth2 import get_current_guard
+from app.serialization import fast_list_response
+from app.fieldsets import FieldsQuery, parse_fields, subset_model
+from app.querylog import query_budget
+from app.tracing import span
 
 router = APIRouter(prefix="/guard-scans", tags=["Guard QR Scans"])
 
-@router.post("/scan", response_model=QRScanResponse)
+VISITOR_FIELDS = {"visitor_name", "visitor_phone", "expires_at", "valid"}
+RESIDENT_FIELDS = {"resident_name", "resident_phone", "resident_apartment"}
+
+
+def scan_list_query(db: Session, selected: tuple[str, ...]):
+    """Projection SQL des champs demandés de GuardQRScanOut.
+
+    Ne joint form_data et users que si un de leurs champs est demandé, et ne
+    charge jamais les colonnes qr_code_data.
+    """
+    columns = {
+        "id": GuardQRScan.id,
+        "form_id": GuardQRScan.form_data_id,
+        "guard_id": GuardQRScan.guard_id,
+        "confirmed": GuardQRScan.confirmed,
+        "scanned_at": GuardQRScan.scanned_at,
+        "created_at": GuardQRScan.created_at,
+        "updated_at": GuardQRScan.updated_at,
+        "visitor_name": FormData.name,
+        "visitor_phone": FormData.phone_number,
+        "expires_at": FormData.expires_at,
+        "valid": FormData.expires_at >= datetime.now(),
+        "resident_name": User.name,
+        "resident_phone": User.phone_number,
+        "resident_apartment": User.appartement,
+    }
+    query = db.query(*[columns[name].label(name) for name in selected]).select_from(GuardQRScan)
+
+    with_resident = not RESIDENT_FIELDS.isdisjoint(selected)
+    if with_resident or not VISITOR_FIELDS.isdisjoint(selected):
+        query = query.outerjoin(FormData, GuardQRScan.form_data_id == FormData.id)
+    if with_resident:
+        query = query.outerjoin(User, FormData.user_id == User.id)
+    return query
+
+def scanned_since(form: FormData):
+    # Un passe ne peut être scanné qu'après sa création : seules les partitions
+    # mensuelles depuis created_at sont lues
+    return (GuardQRScan.scanned_at >= form.created_at,) if form.created_at else ()
+
+@router.post("/scan", response_model=QRScanResponse, dependencies=[query_budget(5)])
 async def scan_qr_code(
     qr_scan: QRScanRequest,
     db: Session = Depends(get_db),
     current_guard: Guard = Depends(get_current_guard)
 ):
-    form = db.query(FormData).filter(FormData.id == qr_scan.form_id).first()
+    with span("scan.form_lookup"):
+        form = db.query(FormData).filter(FormData.id == qr_scan.form_id).first()
 
     if not form:
         return QRScanResponse(valid=False, message="QR code non reconnu ou invalide")
@@ -36,10 +81,12 @@ async def scan_qr_code(
     if not form.user:
         return QRScanResponse(valid=False, message="Données utilisateur manquantes")
 
-    existing_scan = db.query(GuardQRScan).filter(
-        GuardQRScan.form_data_id == qr_scan.form_id,
-        GuardQRScan.confirmed.isnot(None)
-    ).first()
+    with span("scan.existing_probe"):
+        existing_scan = db.query(GuardQRScan).filter(
+            GuardQRScan.form_data_id == qr_scan.form_id,
+            GuardQRScan.confirmed.isnot(None),
+            *scanned_since(form)
+        ).first()
 
     if existing_scan:
         action = "validé" if existing_scan.confirmed else "rejeté"
@@ -62,13 +109,14 @@ async def scan_qr_code(
 
     return QRScanResponse(valid=True, message="QR code valide - Vérifiez les informations", data=scan_data)
 
-@router.post("/confirm", response_model=QRConfirmResponse)
+@router.post("/confirm", response_model=QRConfirmResponse, dependencies=[query_budget(8)])
 async def confirm_access(
     confirm_request: QRConfirmRequest,
     db: Session = Depends(get_db),
     current_guard: Guard = Depends(get_current_guard)
 ):
-    form = db.query(FormData).filter(FormData.id == confirm_request.form_id).first()
+    with span("scan.form_lookup"):
+        form = db.query(FormData).filter(FormData.id == confirm_request.form_id).first()
 
     if not form:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="QR code introuvable")
@@ -76,10 +124,12 @@ async def confirm_access(
     if datetime.now() > form.expires_at:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="QR code expiré - confirmation impossible")
 
-    existing_confirmation = db.query(GuardQRScan).filter(
-        GuardQRScan.form_data_id == confirm_request.form_id,
-        GuardQRScan.confirmed.is_not(None)
-    ).first()
+    with span("scan.existing_probe"):
+        existing_confirmation = db.query(GuardQRScan).filter(
+            GuardQRScan.form_data_id == confirm_request.form_id,
+            GuardQRScan.confirmed.is_not(None),
+            *scanned_since(form)
+        ).first()
 
     if existing_confirmation:
         action = "autorisé" if existing_confirmation.confirmed else "refusé"
@@ -92,31 +142,35 @@ async def confirm_access(
     new_scan = GuardQRScan(
         qr_code_data=str(confirm_request.form_id),
         guard_id=current_guard.id,
+        residence_id=current_guard.residence_id,
         form_data_id=confirm_request.form_id,
         confirmed=confirm_request.confirmed,
         scanned_at=datetime.now()
     )
 
     db.add(new_scan)
-    db.commit()
-    db.refresh(new_scan)
+    with span("scan.commit"):
+        db.commit()
+        db.refresh(new_scan)
 
     action = "autorisé" if confirm_request.confirmed else "refusé"
     message = f"Accès {action} pour {form.name}"
 
     return QRConfirmResponse(success=True, message=message, scan_id=new_scan.id)
 
-@router.get("/history", response_model=List[GuardQRScanOut])
+@router.get("/history", response_model=List[GuardQRScanOut], dependencies=[query_budget(3)])
 async def get_scan_history(
     db: Session = Depends(get_db),
     current_guard: Guard = Depends(get_current_guard),
-    limit: int = 50
+    limit: int = 50,
+    fields: FieldsQuery = None
 ):
-    scans = db.query(GuardQRScan).filter(
+    selected = parse_fields(GuardQRScanOut, fields)
+    scans = scan_list_query(db, selected).filter(
         GuardQRScan.guard_id == current_guard.id
     ).order_by(GuardQRScan.scanned_at.desc()).limit(limit).all()
 
-    return [GuardQRScanOut.from_orm_with_details(scan) for scan in scans]
+    return fast_list_response(subset_model(GuardQRScanOut, selected), scans)
 
 @router.get("/stats", response_model=dict)
 async def get_guard_stats(
@@ -149,17 +203,19 @@ async def get_guard_stats(
         "guard_name": getattr(current_guard, 'name', "Gardien")
     }
 
-@router.get("/residence/scans", response_model=List[GuardQRScanOut])
+@router.get("/residence/scans", response_model=List[GuardQRScanOut], dependencies=[query_budget(3)])
 async def get_residence_scans(
     db: Session = Depends(get_db),
     current_guard: Guard = Depends(get_current_guard),
-    limit: int = 50
+    limit: int = 50,
+    fields: FieldsQuery = None
 ):
-    scans = db.query(GuardQRScan).join(Guard).filter(
-        Guard.residence_id == current_guard.residence_id
+    selected = parse_fields(GuardQRScanOut, fields)
+    scans = scan_list_query(db, selected).filter(
+        GuardQRScan.residence_id == current_guard.residence_id
     ).order_by(GuardQRScan.scanned_at.desc()).limit(limit).all()
 
-    return [GuardQRScanOut.from_orm_with_details(scan) for scan in scans]
+    return fast_list_response(subset_model(GuardQRScanOut, selected), scans)
 
 @router.get("/residence/stats", response_model=dict)
 async def get_residence_stats(
@@ -168,19 +224,19 @@ async def get_residence_stats(
 ):
     today = datetime.now().date()
 
-    today_scans = db.query(GuardQRScan).join(Guard).filter(
-        Guard.residence_id == current_guard.residence_id,
+    today_scans = db.query(GuardQRScan).filter(
+        GuardQRScan.residence_id == current_guard.residence_id,
         GuardQRScan.scanned_at >= today
     ).count()
 
-    today_approved = db.query(GuardQRScan).join(Guard).filter(
-        Guard.residence_id == current_guard.residence_id,
+    today_approved = db.query(GuardQRScan).filter(
+        GuardQRScan.residence_id == current_guard.residence_id,
         GuardQRScan.scanned_at >= today,
         GuardQRScan.confirmed == True
     ).count()
 
-    today_denied = db.query(GuardQRScan).join(Guard).filter(
-        Guard.residence_id == current_guard.residence_id,
+    today_denied = db.query(GuardQRScan).filter(
+        GuardQRScan.residence_id == current_guard.residence_id,
         GuardQRScan.scanned_at >= today,
         GuardQRScan.confirmed == False
     ).count()
@@ -1,46 +1,87 @@
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+import hashlib
+import logging
+import time
+from io import BytesIO
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-import os
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.caching import check_not_modified, make_etag
+from app.metrics import PDF_GENERATION_SECONDS, PDF_SIZE_BYTES
+from app.tracing import set_attributes, span
+from app.profiling import profiled_in_thread
 
 from app.models.data import Attendance, FormData, GuardQRScan, Report, Owner, User, Guard
 from app.postgres_connect import get_db
-from app.schemas.report import ReportCreate, ReportOut, StatisticsOut
+from app.schemas.report import ReportCreate, ReportOut, ReportType, StatisticsOut
+from app.storage import REPORTS_PREFIX, get_storage
 from app.utils import generate_pdf
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
-REPORTS_DIR = "generated_reports"
-os.makedirs(REPORTS_DIR, exist_ok=True)
+logger = logging.getLogger(__name__)
+
+# Période couverte par défaut lorsque date_from / date_to ne sont pas fournis
+DEFAULT_REPORT_WINDOWS = {
+    ReportType.USER_REPORT: timedelta(days=30),
+    ReportType.QR_CODE_REPORT: timedelta(days=30),
+    ReportType.ACTIVITY_REPORT: timedelta(days=30),
+    ReportType.SECURITY_REPORT: timedelta(days=7),
+}
+
+# Les fichiers plus récents que ce délai ne sont jamais collectés : ils
+# peuvent appartenir à un rapport en cours de génération pas encore commité.
+REPORT_GC_GRACE_SECONDS = 600
 
 @router.post("/create-reports", response_model=ReportOut)
+@profiled_in_thread("create_report")
 def create_report(report_data: ReportCreate, db: Session = Depends(get_db)):
     owner = db.query(Owner).filter(Owner.id == report_data.owner_id).first()
     if not owner:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Propriétaire non trouvé.")
 
-    # Récupérer les données selon le type de rapport, filtrées par résidence
-    filtered_data = get_filtered_data(db, report_data.report_type, report_data, owner.residence_id)
-    print("Filtered Data:", filtered_data)  # Log pour vérifier
+    date_from, date_to = resolve_report_period(report_data.report_type, report_data.date_from, report_data.date_to)
 
-    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report_data.title.replace(' ', '_')}.pdf"
-    file_path = os.path.join(REPORTS_DIR, filename)
+    # Un rapport identique (même demande, mêmes données) déjà généré est réutilisé
+    watermark = get_data_watermark(db, report_data.report_type, owner.residence_id, date_from, date_to)
+    cache_key = build_report_cache_key(owner.id, report_data, watermark)
 
-    generate_pdf(
-        file_path=file_path,
-        title=report_data.title,
-        owner_name=owner.name,
-        report_type=report_data.report_type,
-        data=filtered_data
-    )
+    cached_report = find_cached_report(db, owner.id, cache_key)
+    if cached_report:
+        return cached_report
+
+    # Récupérer les données selon le type de rapport, filtrées par résidence
+    filtered_data = get_filtered_data(db, report_data.report_type, owner.residence_id, date_from, date_to)
+
+    file_path = f"{REPORTS_PREFIX}/{cache_key}.pdf"
+
+    buffer = BytesIO()
+    report_type_label = getattr(report_data.report_type, "value", str(report_data.report_type))
+    with PDF_GENERATION_SECONDS.labels(report_type_label).time(), span("pdf.generate", report_type=report_type_label):
+        generate_pdf(
+            file_path=buffer,
+            title=report_data.title,
+            owner_name=owner.name,
+            report_type=report_data.report_type,
+            data=filtered_data
+        )
+        pdf = buffer.getvalue()
+        set_attributes(pdf_size_bytes=len(pdf))
+    PDF_SIZE_BYTES.labels(report_type_label).observe(len(pdf))
+    get_storage().save(file_path, pdf)
 
     report = Report(
         title=report_data.title,
         file_path=file_path,
         owner_id=owner.id,
         residence_id=owner.residence_id,
-        report_type=report_data.report_type
+        report_type=report_data.report_type,
+        cache_key=cache_key,
+        date_from=date_from,
+        date_to=date_to
     )
     db.add(report)
     db.commit()
@@ -48,22 +89,121 @@ def create_report(report_data: ReportCreate, db: Session = Depends(get_db)):
 
     return report
 
-def get_filtered_data(db: Session, report_type: str, report_data: ReportCreate, residence_id: uuid.UUID):
+def _to_naive(value: datetime) -> datetime:
+    # Les colonnes sont des DateTime sans fuseau, en heure locale
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+def resolve_period(date_from: datetime | None, date_to: datetime | None, default_window: timedelta):
+    # Bornes absentes : jusqu'à maintenant, sur default_window (rapports, exports)
+    date_to = _to_naive(date_to) if date_to else datetime.now()
+    date_from = _to_naive(date_from) if date_from else date_to - default_window
+
+    if date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="La date de début doit précéder la date de fin.")
+    return date_from, date_to
+
+def resolve_report_period(report_type: str, date_from: datetime | None, date_to: datetime | None):
+    default_window = DEFAULT_REPORT_WINDOWS.get(ReportType(report_type), timedelta(days=30))
+    return resolve_period(date_from, date_to, default_window)
+
+def get_data_watermark(db: Session, report_type: str, residence_id: uuid.UUID, date_from: datetime, date_to: datetime) -> str:
+    # Dernière modification + volume des lignes couvertes : change dès qu'une
+    # ligne est ajoutée, modifiée ou sort de la fenêtre
+    if report_type == "activity_report":
+        # updated_at et non max(end_time) : la clôture d'un service plus ancien
+        # que le dernier terminé doit aussi invalider le cache
+        last_update, total = db.query(
+            func.max(Attendance.updated_at), func.count(Attendance.id)
+        ).join(Attendance.guard).filter(
+            Guard.residence_id == residence_id,
+            Attendance.start_time >= date_from,
+            Attendance.start_time <= date_to
+        ).one()
+        return f"{last_update}|{total}"
+
+    query = db.query(func.max(GuardQRScan.updated_at), func.count(GuardQRScan.id))
+    if report_type != "security_report":
+        # Mêmes lignes que les rapports utilisateurs / QR codes : scans rattachés à un passe
+        query = query.filter(GuardQRScan.form_data_id.isnot(None))
+
+    last_update, total = query.filter(
+        GuardQRScan.residence_id == residence_id,
+        GuardQRScan.scanned_at >= date_from,
+        GuardQRScan.scanned_at <= date_to
+    ).one()
+    return f"{last_update}|{total}"
+
+def build_report_cache_key(owner_id: uuid.UUID, report_data: ReportCreate, watermark: str) -> str:
+    # On garde les bornes telles que demandées : une fenêtre par défaut glisse
+    # avec le temps, et c'est le watermark qui détecte les changements de données
+    parts = [
+        str(owner_id),
+        ReportType(report_data.report_type).value,
+        report_data.title,
+        report_data.date_from.isoformat() if report_data.date_from else "default",
+        report_data.date_to.isoformat() if report_data.date_to else "default",
+        watermark,
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def find_cached_report(db: Session, owner_id: uuid.UUID, cache_key: str) -> Report | None:
+    if settings.report_cache_minutes <= 0:
+        return None
+
+    min_created_at = datetime.now(timezone.utc) - timedelta(minutes=settings.report_cache_minutes)
+    report = db.query(Report).filter(
+        Report.owner_id == owner_id,
+        Report.cache_key == cache_key,
+        Report.created_at >= min_created_at
+    ).order_by(Report.created_at.desc()).first()
+
+    if report and get_storage().exists(report.file_path):
+        return report
+    return None
+
+def collect_unreferenced_reports(db: Session) -> int:
+    storage = get_storage()
+    referenced = {path for (path,) in db.query(Report.file_path).all()}
+    now = time.time()
+    removed = 0
+
+    for obj in storage.list(REPORTS_PREFIX):
+        if obj.key in referenced:
+            continue
+        if now - obj.last_modified.timestamp() < REPORT_GC_GRACE_SECONDS:
+            continue
+        try:
+            storage.delete(obj.key)
+            removed += 1
+        except OSError as e:
+            logger.warning("Erreur lors de la suppression du fichier %s: %s", obj.key, e)
+
+    return removed
+
+def get_filtered_data(db: Session, report_type: str, residence_id: uuid.UUID, date_from: datetime, date_to: datetime):
     if report_type == "user_report":
-        return get_user_report_data(db, residence_id)
+        data = get_user_report_data(db, residence_id, date_from, date_to)
     elif report_type == "qr_code_report":
-        return get_qr_code_report_data(db, residence_id)
+        data = get_qr_code_report_data(db, residence_id, date_from, date_to)
     elif report_type == "activity_report":
-        return get_activity_report_data(db, report_data, residence_id)
+        data = get_activity_report_data(db, residence_id, date_from, date_to)
     elif report_type == "security_report":
-        return get_security_report_data(db, residence_id)
-    return {}
+        data = get_security_report_data(db, residence_id, date_from, date_to)
+    else:
+        return {}
 
-def get_user_report_data(db: Session, residence_id: uuid.UUID):
+    data['period'] = {'from': date_from, 'to': date_to}
+    return data
+
+def get_user_report_data(db: Session, residence_id: uuid.UUID, date_from: datetime, date_to: datetime):
     scans = db.query(GuardQRScan)\
-        .join(GuardQRScan.form_data)\
-        .join(FormData.user)\
-        .filter(User.residence_id == residence_id)\
+        .filter(GuardQRScan.residence_id == residence_id,
+                GuardQRScan.form_data_id.isnot(None),
+                GuardQRScan.scanned_at >= date_from,
+                GuardQRScan.scanned_at <= date_to)\
         .all()
 
     unique_users = set(scan.form_data.user_id for scan in scans)
@@ -79,11 +219,12 @@ def get_user_report_data(db: Session, residence_id: uuid.UUID):
         'focus': 'users'
     }
 
-def get_qr_code_report_data(db: Session, residence_id: uuid.UUID):
+def get_qr_code_report_data(db: Session, residence_id: uuid.UUID, date_from: datetime, date_to: datetime):
     scans = db.query(GuardQRScan)\
-        .join(GuardQRScan.form_data)\
-        .join(FormData.user)\
-        .filter(User.residence_id == residence_id)\
+        .filter(GuardQRScan.residence_id == residence_id,
+                GuardQRScan.form_data_id.isnot(None),
+                GuardQRScan.scanned_at >= date_from,
+                GuardQRScan.scanned_at <= date_to)\
         .all()
 
     unique_qr_codes = set(scan.qr_code_data for scan in scans)
@@ -99,10 +240,12 @@ def get_qr_code_report_data(db: Session, residence_id: uuid.UUID):
         'focus': 'qr_codes'
     }
 
-def get_activity_report_data(db: Session, report_data: ReportCreate, residence_id: uuid.UUID):
+def get_activity_report_data(db: Session, residence_id: uuid.UUID, date_from: datetime, date_to: datetime):
     attendances = db.query(Attendance)\
         .join(Attendance.guard)\
-        .filter(Guard.residence_id == residence_id)\
+        .filter(Guard.residence_id == residence_id,
+                Attendance.start_time >= date_from,
+                Attendance.start_time <= date_to)\
         .all()
 
     guard_attendances = {}
@@ -117,17 +260,14 @@ def get_activity_report_data(db: Session, report_data: ReportCreate, residence_i
 
     return {
         'report_type': 'activity_report',
-        'period': {
-            'from': report_data.date_from,
-            'to': report_data.date_to
-        },
         'guard_attendances': guard_attendances
     }
 
-def get_security_report_data(db: Session, residence_id: uuid.UUID):
+def get_security_report_data(db: Session, residence_id: uuid.UUID, date_from: datetime, date_to: datetime):
     scans = db.query(GuardQRScan)\
-        .join(GuardQRScan.guard)\
-        .filter(Guard.residence_id == residence_id)\
+        .filter(GuardQRScan.residence_id == residence_id,
+                GuardQRScan.scanned_at >= date_from,
+                GuardQRScan.scanned_at <= date_to)\
         .all()
 
     return {
@@ -145,19 +285,16 @@ def get_statistics(residence_id: uuid.UUID ,
                    db: Session = Depends(get_db)):
     
     total_users = db.query(User).filter(User.residence_id == residence_id).count()
-    total_qr_codes = db.query(FormData).join(FormData.user).filter(User.residence_id == residence_id).count()
+    total_qr_codes = db.query(FormData).filter(FormData.residence_id == residence_id).count()
     active_qr_codes = db.query(FormData)\
-        .join(FormData.user)\
-        .filter(FormData.expires_at > datetime.now(), User.residence_id == residence_id).count()
+        .filter(FormData.expires_at > datetime.now(), FormData.residence_id == residence_id).count()
+    # Scans rattachés à un passe, comme les rapports utilisateurs / QR codes
     total_scans = db.query(GuardQRScan)\
-        .join(GuardQRScan.form_data)\
-        .join(FormData.user)\
-        .filter(User.residence_id == residence_id).count()
+        .filter(GuardQRScan.residence_id == residence_id, GuardQRScan.form_data_id.isnot(None)).count()
     users_this_month = db.query(User)\
         .filter(User.created_at >= datetime.now() - timedelta(days=30), User.residence_id == residence_id).count()
     qr_codes_this_month = db.query(FormData)\
-        .join(FormData.user)\
-        .filter(FormData.created_at >= datetime.now() - timedelta(days=30), User.residence_id == residence_id).count()
+        .filter(FormData.created_at >= datetime.now() - timedelta(days=30), FormData.residence_id == residence_id).count()
 
     return {
         "total_users": total_users,
@@ -174,15 +311,18 @@ def delete_report(report_id: str, db: Session = Depends(get_db)):
     if not report:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rapport non trouvé.")
 
-    if os.path.exists(report.file_path):
-        try:
-            os.remove(report.file_path)
-        except OSError as e:
-            print(f"Erreur lors de la suppression du fichier: {e}")
-
+    file_path = report.file_path
     db.delete(report)
     db.commit()
 
+    # Le fichier peut être partagé avec un autre rapport ayant la même clé de cache
+    still_referenced = db.query(Report.id).filter(Report.file_path == file_path).first()
+    if not still_referenced:
+        try:
+            get_storage().delete(file_path)
+        except OSError as e:
+            logger.warning("Erreur lors de la suppression du fichier %s: %s", file_path, e)
+
     return {"message": "Rapport supprimé avec succès."}
 
 @router.get("/list/{owner_id}")
@@ -195,7 +335,15 @@ def list_reports(owner_id: str, db: Session = Depends(get_db)):
     return reports
 
 @router.get("/{report_id}")
-def get_report(report_id: str, db: Session = Depends(get_db)):
+def get_report(report_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    created_at = db.query(Report.created_at).filter(Report.id == report_id).scalar()
+    if created_at is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rapport non trouvé.")
+
+    not_modified = check_not_modified(request, response, make_etag("report", report_id, created_at), "report", created_at)
+    if not_modified:
+        return not_modified
+
     report = db.query(Report).filter(Report.id == report_id).first()
     if not report:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rapport non trouvé.")
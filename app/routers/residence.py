@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
 from uuid import UUID, uuid4
 from datetime import datetime
 
+from app.caching import check_not_modified, make_etag
+from app.batch import BatchIds, batch_response, id_in, unique_ids
 from app.postgres_connect import get_db
-from app.models.data import Residence
+from app.models.data import Owner, Residence
 from app.schemas.residence import ResidenceCreate, ResidenceOut
+from app.schemas.batch import BatchOut
 
 router = APIRouter(
     prefix="/residences",
@@ -28,10 +32,36 @@ def create_residence(payload: ResidenceCreate, db: Session = Depends(get_db)):
 
 # ✅ Récupérer toutes les résidences
 @router.get("/", response_model=list[ResidenceOut])
-def list_residences(db: Session = Depends(get_db)):
+def list_residences(request: Request, response: Response, db: Session = Depends(get_db)):
+    # Version de la liste : nombre de lignes et dernière modification, des
+    # résidences et des gestionnaires imbriqués dans la réponse (owners)
+    count, last_modified, owner_count, owner_last_modified = db.query(
+        func.count(Residence.id),
+        func.max(Residence.updated_at),
+        db.query(func.count(Owner.id)).scalar_subquery(),
+        db.query(func.max(Owner.updated_at)).scalar_subquery(),
+    ).one()
+    etag = make_etag("residences", count, last_modified, owner_count, owner_last_modified)
+    last_modified = max((value for value in (last_modified, owner_last_modified) if value is not None), default=None)
+    not_modified = check_not_modified(request, response, etag, "residences", last_modified)
+    if not_modified:
+        return not_modified
+
     residences = db.query(Residence).all()
     return residences
 
+# ✅ Récupérer plusieurs résidences en une requête
+@router.get("/batch", response_model=BatchOut[ResidenceOut])
+def get_residences_batch(ids: BatchIds, db: Session = Depends(get_db)):
+    ids = unique_ids(ids)
+    residences = (
+        db.query(Residence)
+        .options(selectinload(Residence.owners))
+        .filter(id_in(Residence.id, ids))
+        .all()
+    )
+    return batch_response(ResidenceOut, ids, residences)
+
 # ✅ Récupérer une résidence par ID
 @router.get("/{residence_id}", response_model=ResidenceOut)
 def get_residence(residence_id: UUID, db: Session = Depends(get_db)):
@@ -1,5 +1,5 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from uuid import UUID
@@ -9,8 +9,14 @@ from app.schemas.user import UserCreate, UserOut, ChangePassword
 from app.models.data import User
 from app.models.data import Residence 
 from app.postgres_connect import get_db
-from app.utils import hashed, verify
-from app.oauth2 import get_current_user
+from app.serialization import fast_list_response
+from app.fieldsets import FieldsQuery, load_columns, parse_fields, subset_model
+from app.batch import BatchIds, batch_response, id_in, unique_ids
+from app.schemas.batch import BatchOut
+from app.caching import check_not_modified, make_etag
+from app.ratelimit import password_reset_throttle
+from app.utils import hashed, hashed_async, verify_async
+from app.oauth2 import get_current_user, revoke_principal_refresh_tokens
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -42,7 +48,7 @@ async def create_user(user: UserCreate, db: Annotated[Session, Depends(get_db)])
 
         new_user = User(
             name=user.name,
-            password=hashed(user.password),
+            password=await hashed_async(user.password),
             phone_number=user.phone_number,
             appartement=user.appartement,
             resident="welqo",
@@ -64,25 +70,34 @@ async def create_user(user: UserCreate, db: Annotated[Session, Depends(get_db)])
     
 
 @router.get("/me", response_model=UserOut)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(request: Request, response: Response,
+                                   current_user: User = Depends(get_current_user)):
+    not_modified = check_not_modified(
+        request, response, make_etag("user", current_user.id, current_user.updated_at),
+        "profile", current_user.updated_at,
+    )
+    if not_modified:
+        return not_modified
     return current_user
 
 
 @router.put("/change-password", status_code=status.HTTP_200_OK)
 async def change_password(data: ChangePassword, db: Annotated[Session, Depends(get_db)]):
     user = db.query(User).filter_by(phone_number=data.phone_number).first()
-    if not user or not verify(data.old_password, user.password):
+    if not user or not await verify_async(data.old_password, user.password):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Ancien mot de passe incorrect."
         )
 
-    user.password = hashed(data.new_password)
+    user.password = await hashed_async(data.new_password)
+    revoke_principal_refresh_tokens(db, "user", user.id)
     db.commit()
     return {"message": "Mot de passe mis à jour avec succès."}
 
 
-@router.post("/forgot-password", response_model=MessageResponse)
+@router.post("/forgot-password", response_model=MessageResponse,
+             dependencies=[Depends(password_reset_throttle("user", "forgot"))])
 def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.phone_number == request.phone_number).first()
     if not user:
@@ -90,7 +105,8 @@ def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db
     return {"message": "Numéro de téléphone valide. Veuillez saisir votre nouveau mot de passe."}
 
 
-@router.post("/reset-password", response_model=MessageResponse)
+@router.post("/reset-password", response_model=MessageResponse,
+             dependencies=[Depends(password_reset_throttle("user", "reset"))])
 def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.phone_number == request.phone_number).first()
     if not user:
@@ -102,6 +118,7 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
                             detail="Les mots de passe ne correspondent pas")
 
     user.password = hashed(request.new_password)
+    revoke_principal_refresh_tokens(db, "user", user.id)
     db.commit()
     db.refresh(user)
 
@@ -109,7 +126,15 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
 
 
 @router.get("/all", response_model=list[UserOut])
-async def get_all_users(residence_id: UUID, db: Annotated[Session, Depends(get_db)]):
-    users = db.query(User).filter(User.residence_id == residence_id).all()
-    return users
-
+async def get_all_users(residence_id: UUID, db: Annotated[Session, Depends(get_db)], fields: FieldsQuery = None):
+    selected = parse_fields(UserOut, fields)
+    users = db.query(User).options(load_columns(User, selected)).filter(User.residence_id == residence_id).all()
+    return fast_list_response(subset_model(UserOut, selected), users)
+
+
+@router.get("/batch", response_model=BatchOut[UserOut])
+async def get_users_batch(residence_id: UUID, ids: BatchIds, db: Annotated[Session, Depends(get_db)]):
+    # Même périmètre que /users/all : les résidents de la résidence demandée
+    ids = unique_ids(ids)
+    users = db.query(User).filter(id_in(User.id, ids), User.residence_id == residence_id).all()
+    return batch_response(UserOut, ids, users)
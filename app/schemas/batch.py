@@ -0,0 +1,12 @@
+from typing import Generic, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class BatchOut(BaseModel, Generic[T]):
+    # Résultats indexés par id ; les ids inconnus ou non autorisés sont dans missing
+    items: dict[UUID, T]
+    missing: list[UUID]
@@ -9,6 +9,11 @@ class Token(BaseModel):
     token_type: str
     user_name: str
     residence_id: UUID
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -16,6 +21,8 @@ class TokenData(BaseModel):
     user_name: Optional[str] = None
     guard_id: Optional[UUID] = None
     guard_name: Optional[str] = None
+    owner_id: Optional[UUID] = None
+    owner_name: Optional[str] = None
     residence_id: Optional[UUID] = None
 
 
@@ -0,0 +1,21 @@
+from functools import lru_cache
+from typing import Iterable
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
+
+def fast_list_response(schema, items: Iterable) -> Response:
+    """Valide une liste (objets ORM ou modèles) avec le schéma et la sérialise
+    en JSON directement dans pydantic-core, sans passer par jsonable_encoder.
+
+    Le response_model de la route reste déclaré pour la documentation OpenAPI.
+    """
+    adapter = _list_adapter(schema)
+    validated = adapter.validate_python(list(items), from_attributes=True)
+    return Response(content=adapter.dump_json(validated), media_type="application/json")
@@ -0,0 +1,78 @@
+"""Point d'entrée de production : python -m app.server
+
+Lance uvicorn en multi-processus (uvloop + httptools quand ils sont
+disponibles). Chaque worker est recyclé après WEB_MAX_REQUESTS requêtes, plus
+un supplément tiré entre 0 et WEB_MAX_REQUESTS_JITTER propre au worker, et le
+pool SQLAlchemy de chaque worker est dimensionné à partir du budget global de
+connexions (voir postgres_connect.pool_options).
+"""
+import importlib.util
+import os
+import random
+import tempfile
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app.config import settings
+
+
+def default_workers() -> int:
+    # Respecte les limites de CPU du conteneur (affinité) quand c'est possible
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, cpus)
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class WorkerConfig(uvicorn.Config):
+    def load(self):
+        # Appelé dans chaque worker (et à chaque redémarrage) : des workers
+        # lancés ensemble ne sont pas recyclés tous à la même requête
+        if self.limit_max_requests and settings.web_max_requests_jitter > 0:
+            self.limit_max_requests += random.randint(0, settings.web_max_requests_jitter)
+        super().load()
+
+
+def main():
+    workers = settings.web_workers or default_workers()
+    # Les workers relisent la configuration : ils héritent du nombre retenu
+    # pour calculer leur part du budget de connexions
+    os.environ["WEB_WORKERS"] = str(workers)
+    if workers > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        # Métriques partagées entre workers, agrégées par /metrics
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="welqo-metrics-")
+
+    config = WorkerConfig(
+        "app.main:app",
+        host=settings.web_host,
+        port=settings.web_port,
+        workers=workers,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        limit_max_requests=settings.web_max_requests or None,
+        timeout_keep_alive=settings.web_keep_alive_seconds,
+        backlog=settings.web_backlog,
+        proxy_headers=settings.trust_forwarded_for,
+        forwarded_allow_ips=settings.forwarded_allow_ips,
+        access_log=settings.web_access_log,
+    )
+    server = uvicorn.Server(config)
+    try:
+        # Un worker unique passe aussi par le superviseur : sans lui, le
+        # recyclage arrêterait le serveur au lieu de relancer le worker
+        if workers > 1 or config.limit_max_requests:
+            Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+        else:
+            server.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import os
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import BinaryIO, Iterator, Optional, Union
+from urllib.parse import quote
+
+from app.config import settings
+
+REPORTS_PREFIX = "generated_reports"
+LOGOS_PREFIX = "uploaded_logos"
+
+# Taille des blocs envoyés lors d'un téléchargement en streaming
+CHUNK_SIZE = 64 * 1024
+
+
+def attachment_disposition(filename: str) -> str:
+    # Comme FileResponse : filename* (RFC 5987) dès qu'un caractère doit être
+    # échappé (guillemet, hors ASCII), les en-têtes étant encodés en latin-1
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+@dataclass
+class StoredObject:
+    key: str
+    size: int
+    last_modified: datetime
+
+
+class Storage(ABC):
+    """Stockage des fichiers générés (rapports PDF, logos), adressés par clé."""
+
+    def prepare(self, prefixes: tuple[str, ...]) -> None:
+        """Préparation au démarrage (lifespan), jamais à l'import."""
+
+    @abstractmethod
+    def save(self, key: str, data: Union[bytes, BinaryIO]) -> None:
+        ...
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[StoredObject]:
+        ...
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str) -> Iterator[StoredObject]:
+        ...
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        """Lit les octets [start, end] (bornes incluses) par blocs."""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Chemin sur le disque si le backend est local, sinon None."""
+        return None
+
+    def presigned_url(self, key: str, filename: str, media_type: str) -> Optional[str]:
+        return None
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Clé de stockage invalide: {key}")
+        return path
+
+    def prepare(self, prefixes):
+        for prefix in prefixes:
+            os.makedirs(self._path(prefix), exist_ok=True)
+
+    def save(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Écriture dans un fichier temporaire puis renommage atomique, pour
+        # qu'un autre worker ne serve jamais un fichier à moitié écrit
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as buffer:
+                if isinstance(data, bytes):
+                    buffer.write(data)
+                else:
+                    while chunk := data.read(CHUNK_SIZE):
+                        buffer.write(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def stat(self, key):
+        try:
+            st = os.stat(self._path(key))
+        except FileNotFoundError:
+            return None
+        return StoredObject(key=key, size=st.st_size, last_modified=datetime.fromtimestamp(st.st_mtime))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix):
+        directory = self._path(prefix)
+        if not os.path.isdir(directory):
+            return
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                st = entry.stat()
+                yield StoredObject(
+                    key=f"{prefix.rstrip('/')}/{entry.name}",
+                    size=st.st_size,
+                    last_modified=datetime.fromtimestamp(st.st_mtime)
+                )
+
+    def iter_range(self, key, start, end):
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def local_path(self, key):
+        return self._path(key)
+
+
+class S3Storage(Storage):
+    """Backend compatible S3 (AWS, MinIO, ...). Nécessite boto3."""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key_id: Optional[str] = None,
+                 secret_access_key: Optional[str] = None):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("Le paquet boto3 est requis pour STORAGE_BACKEND=s3") from e
+
+        self._client_error = ClientError
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def save(self, key, data):
+        if isinstance(data, bytes):
+            self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+        else:
+            self.client.upload_fileobj(data, self.bucket, self._object_key(key))
+
+    def stat(self, key):
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredObject(key=key, size=head["ContentLength"], last_modified=head["LastModified"])
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def list(self, prefix):
+        paginator = self.client.get_paginator("list_objects_v2")
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix.rstrip("/") + "/")):
+            for obj in page.get("Contents", []):
+                yield StoredObject(key=obj["Key"][strip:], size=obj["Size"], last_modified=obj["LastModified"])
+
+    def iter_range(self, key, start, end):
+        response = self.client.get_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Range=f"bytes={start}-{end}"
+        )
+        yield from response["Body"].iter_chunks(CHUNK_SIZE)
+
+    def presigned_url(self, key, filename, media_type):
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._object_key(key),
+                "ResponseContentType": media_type,
+                "ResponseContentDisposition": attachment_disposition(filename),
+            },
+            ExpiresIn=int(timedelta(minutes=settings.storage_presigned_url_minutes).total_seconds())
+        )
+
+
+@lru_cache
+def get_storage() -> Storage:
+    if settings.storage_backend == "s3":
+        return S3Storage(
+            bucket=settings.s3_bucket,
+            prefix=settings.s3_prefix,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+        )
+    return LocalStorage(settings.storage_root)
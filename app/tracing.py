@@ -0,0 +1,185 @@
+import os
+import threading
+from contextlib import nullcontext
+from typing import Optional, Sequence
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.querylog import observe_statements
+
+# Initialisé par init_tracing() (lifespan) ; None = traçage désactivé, et
+# chaque span() se réduit à un nullcontext
+_tracer = None
+
+# Taille maximale du texte SQL attaché aux spans (jamais les paramètres)
+MAX_STATEMENT_LENGTH = 500
+
+
+def init_tracing():
+    """Configure OpenTelemetry si TRACING_ENABLED ; le SDK n'est importé qu'ici."""
+    global _tracer
+    if not settings.tracing_enabled or _tracer is not None:
+        return
+
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if settings.tracing_exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError as e:
+            raise RuntimeError(
+                "Le paquet opentelemetry-exporter-otlp-proto-http est requis pour TRACING_EXPORTER=otlp"
+            ) from e
+        exporter = OTLPSpanExporter()
+    elif settings.tracing_exporter == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        exporter = JsonFileSpanExporter(settings.tracing_file.format(pid=os.getpid()))
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("app")
+
+
+def shutdown_tracing():
+    global _tracer
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+    _tracer = None
+
+
+class JsonFileSpanExporter:
+    """Écrit chaque span sur une ligne JSON (format ReadableSpan.to_json).
+
+    Lecture : `jq -c '{name, duration: ...}' traces-<pid>.jsonl` ou import
+    dans n'importe quel outil acceptant du JSON ligne par ligne.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence):
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as output:
+                output.write(lines)
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def span(name: str, **attributes):
+    """Span enfant du span courant ; sans effet si le traçage est désactivé."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def set_attributes(**attributes):
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+
+    trace.get_current_span().set_attributes(attributes)
+
+
+def _start_db_span(statement, executemany):
+    if _tracer is None:
+        return None
+    return _tracer.start_span(
+        "db.query",
+        attributes={
+            "db.system": "postgresql",
+            "db.statement": " ".join(statement.split())[:MAX_STATEMENT_LENGTH],
+            "db.executemany": executemany,
+        },
+    )
+
+
+def _end_db_span(db_span, _elapsed, rowcount, error):
+    if db_span is None:
+        return
+    if error is None:
+        db_span.set_attribute("db.rowcount", rowcount)
+    else:
+        from opentelemetry.trace import Status, StatusCode
+
+        db_span.record_exception(error)
+        db_span.set_status(Status(StatusCode.ERROR))
+    db_span.end()
+
+
+# Span ouvert et fermé par le chronométrage partagé de querylog
+observe_statements(_end_db_span, started=_start_db_span)
+
+
+class TracingMiddleware:
+    """Span racine de chaque requête HTTP, rattaché au traceparent entrant s'il existe."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        from opentelemetry import context, propagate, trace
+        from opentelemetry.trace import Status, StatusCode
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        token = context.attach(propagate.extract(carrier))
+        status_code: Optional[int] = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            with _tracer.start_as_current_span(
+                f"{scope['method']} {scope['path']}",
+                kind=trace.SpanKind.SERVER,
+                attributes={"http.method": scope["method"], "http.target": scope["path"]},
+            ) as request_span:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    # Le gabarit n'est connu qu'après le routage
+                    route = getattr(scope.get("route"), "path", None)
+                    if route:
+                        request_span.update_name(f"{scope['method']} {route}")
+                        request_span.set_attribute("http.route", route)
+                    if status_code is not None:
+                        request_span.set_attribute("http.status_code", status_code)
+                        if status_code >= 500:
+                            request_span.set_status(Status(StatusCode.ERROR))
+        finally:
+            context.detach(token)
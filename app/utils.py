@@ -1,17 +1,49 @@
-import qrcode
 import base64
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.platypus import Table, TableStyle
-from reportlab.lib import colors
 from datetime import datetime
-import requests
 import os
 
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import settings
+from app.tracing import set_attributes, span
+from app.metrics import (
+    PASSWORD_HASH_QUEUE_WAIT,
+    PASSWORD_HASH_REJECTED,
+    PASSWORD_HASH_SECONDS,
+    QR_RENDER_SECONDS,
+)
+
+
+def build_password_context(schemes: list[str], bcrypt_rounds: int = 12, argon2_time_cost: int = 3,
+                           argon2_memory_cost: int = 65536, argon2_parallelism: int = 4) -> CryptContext:
+    options = {}
+    # Coût min = max = coût configuré : needs_update() signale tout hachage
+    # dont le coût diffère, à la hausse comme à la baisse
+    if "bcrypt" in schemes:
+        options.update(bcrypt__rounds=bcrypt_rounds,
+                       bcrypt__min_rounds=bcrypt_rounds,
+                       bcrypt__max_rounds=bcrypt_rounds)
+    if "argon2" in schemes:
+        options.update(argon2__rounds=argon2_time_cost,
+                       argon2__min_rounds=argon2_time_cost,
+                       argon2__max_rounds=argon2_time_cost,
+                       argon2__memory_cost=argon2_memory_cost,
+                       argon2__parallelism=argon2_parallelism)
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+pwd_context = build_password_context(
+    [scheme.strip() for scheme in settings.password_schemes.split(",") if scheme.strip()],
+    bcrypt_rounds=settings.bcrypt_rounds,
+    argon2_time_cost=settings.argon2_time_cost,
+    argon2_memory_cost=settings.argon2_memory_cost,
+    argon2_parallelism=settings.argon2_parallelism,
+)
 
 def hashed(password: str):
     return pwd_context.hash(password)
@@ -19,16 +51,110 @@ def hashed(password: str):
 def verify(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_rehash(plain_password, hashed_password):
+    """Retourne (valide, nouveau_hachage) ; le nouveau hachage n'est calculé que
+    si l'ancien utilise un schéma ou un coût qui n'est plus celui configuré."""
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+
+class PasswordHashStats:
+    """Temps d'attente des tâches de hachage avant leur exécution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.rejected = 0
+
+    def observe_wait(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+        PASSWORD_HASH_QUEUE_WAIT.observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_wait_seconds": self.total_wait / self.count if self.count else 0.0,
+                "max_wait_seconds": self.max_wait,
+                "rejected": self.rejected,
+                "pending": _hash_pending,
+            }
+
+
+# bcrypt coûte plusieurs dizaines de ms de CPU : on l'exécute dans un pool
+# dédié et borné pour ne bloquer ni la boucle d'événements ni le threadpool
+# partagé des routes synchrones
+_hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers,
+                                    thread_name_prefix="password-hash")
+_hash_pending = 0
+password_hash_stats = PasswordHashStats()
+
+async def run_password_hash(func, *args):
+    global _hash_pending
+    if _hash_pending >= settings.password_hash_max_pending:
+        password_hash_stats.rejected += 1
+        PASSWORD_HASH_REJECTED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serveur momentanément surchargé, veuillez réessayer.",
+            headers={"Retry-After": "1"},
+        )
+
+    submitted_at = time.perf_counter()
+    queue_wait = 0.0
+
+    def job():
+        nonlocal queue_wait
+        queue_wait = time.perf_counter() - submitted_at
+        password_hash_stats.observe_wait(queue_wait)
+        with PASSWORD_HASH_SECONDS.labels(func.__name__).time():
+            return func(*args)
+
+    # _hash_pending n'est modifié que depuis la boucle d'événements.
+    # Le span est ouvert ici : run_in_executor ne propage pas le contexte au thread
+    _hash_pending += 1
+    try:
+        with span("password.hash", operation=func.__name__):
+            result = await asyncio.get_running_loop().run_in_executor(_hash_executor, job)
+            set_attributes(queue_wait_ms=queue_wait * 1000)
+            return result
+    finally:
+        _hash_pending -= 1
+
+async def hashed_async(password: str):
+    return await run_password_hash(hashed, password)
+
+async def verify_async(plain_password, hashed_password):
+    return await run_password_hash(verify, plain_password, hashed_password)
+
+async def verify_and_rehash_async(plain_password, hashed_password):
+    return await run_password_hash(verify_and_rehash, plain_password, hashed_password)
+
 def generate_qr_content(user_name: str, user_phone: str, user_appartement: str, visitor_name: str, visitor_phone: str, duration_minutes: int) -> str:
     return f"User Name: {user_name}, User Phone: {user_phone}, User Appartement: {user_appartement}, Visitor Name: {visitor_name}, Visitor Phone: {visitor_phone}, Duration: {duration_minutes} minutes"
 
 def generate_qr_code_base64(data: str) -> str:
-    qr = qrcode.make(data)
-    buffer = BytesIO()
-    qr.save(buffer, format="PNG")
+    # Imports différés : qrcode, PIL et reportlab ne sont chargés qu'au premier usage
+    import qrcode
+
+    with QR_RENDER_SECONDS.time(), span("qr.render"):
+        qr = qrcode.make(data)
+        buffer = BytesIO()
+        qr.save(buffer, format="PNG")
     return base64.b64encode(buffer.getvalue()).decode("utf-8")
 
 def generate_pdf(file_path, title, owner_name, report_type, data: dict):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
     c = canvas.Canvas(file_path, pagesize=A4)
     width, height = A4
 
@@ -43,6 +169,10 @@ def generate_pdf(file_path, title, owner_name, report_type, data: dict):
     c.drawString(50, height - 90, f"Propriétaire: {owner_name}")
     c.drawString(50, height - 105, f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
 
+    period = data.get('period')
+    if period:
+        c.drawString(50, height - 120, f"Période: {period['from'].strftime('%d/%m/%Y %H:%M')} - {period['to'].strftime('%d/%m/%Y %H:%M')}")
+
     # Résumé selon le type de rapport
     y_position = height - 140
     y_position = add_summary_section(c, data.get('summary', {}), y_position, report_type)
@@ -110,6 +240,9 @@ def add_summary_section(c, summary, y_position, report_type):
     return y_position
 
 def add_data_table(c, scans, focus, y_position):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
     if focus == 'users':
         headers = ["Visiteur", "Téléphone", "Garde", "Heure de scan"]
         data = [headers]
@@ -169,6 +302,9 @@ def add_data_table(c, scans, focus, y_position):
     return y_position - len(data) * 15 - 20
 
 def add_guard_attendance_table(c, guard_attendances, y_position):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
     headers = ["Garde", "Heure de début", "Heure de fin"]
     data = [headers]
 
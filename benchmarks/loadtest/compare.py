@@ -0,0 +1,82 @@
+"""Comparaison de deux résultats de la suite de charge (ex. main contre une branche).
+
+Une opération régresse si son p95 ou son p99 augmente de plus de --threshold %
+(et d'au moins --min-delta-ms, pour ignorer le bruit des opérations très
+rapides) ou si son débit baisse de plus de --threshold %. Code de sortie 1 en
+cas de régression, pour la CI.
+
+Usage :
+    python -m benchmarks.loadtest.compare loadtest-results/a1b2c3d.json loadtest-results/e4f5a6b.json
+"""
+import argparse
+import json
+import sys
+
+
+def change(before: float, after: float) -> float:
+    if before == 0:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float) -> list[str]:
+    print(f"référence : {baseline['meta'].get('commit')}  ->  actuel : {current['meta'].get('commit')}")
+    regressions = []
+    for scenario, result in current["scenarios"].items():
+        reference = baseline["scenarios"].get(scenario)
+        if reference is None:
+            continue
+        print(f"\n{scenario}")
+        for name, row in result["operations"].items():
+            before = reference["operations"].get(name)
+            if before is None or not before["count"] or not row["count"]:
+                continue
+            flags = []
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                delta = change(before[key], row[key])
+                if key != "p50_ms" and delta > threshold and row[key] - before[key] >= min_delta_ms:
+                    flags.append(key)
+            throughput = change(before["throughput_rps"], row["throughput_rps"])
+            if throughput < -threshold:
+                flags.append("throughput_rps")
+            print(f"  {name:<22} p50 {before['p50_ms']:7.1f} -> {row['p50_ms']:7.1f}ms "
+                  f"({change(before['p50_ms'], row['p50_ms']):+5.0f}%)  "
+                  f"p95 {before['p95_ms']:7.1f} -> {row['p95_ms']:7.1f}ms "
+                  f"({change(before['p95_ms'], row['p95_ms']):+5.0f}%)  "
+                  f"p99 {before['p99_ms']:7.1f} -> {row['p99_ms']:7.1f}ms "
+                  f"({change(before['p99_ms'], row['p99_ms']):+5.0f}%)  "
+                  f"débit {throughput:+5.0f}%" + ("  RÉGRESSION" if flags else ""))
+            if flags:
+                regressions.append(f"{scenario}/{name} : {', '.join(flags)}")
+    return regressions
+
+
+def report(regressions: list[str]) -> int:
+    if regressions:
+        print("\nRégressions :")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nAucune régression au-delà du seuil")
+    return 0
+
+
+def main(args) -> int:
+    with open(args.baseline, encoding="utf-8") as source:
+        baseline = json.load(source)
+    with open(args.current, encoding="utf-8") as source:
+        current = json.load(source)
+    return report(compare(baseline, current, args.threshold, args.min_delta_ms))
+
+
+def add_arguments(parser):
+    parser.add_argument("--threshold", type=float, default=10.0, help="variation tolérée, en %%")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
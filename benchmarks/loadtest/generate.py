@@ -0,0 +1,390 @@
+"""Générateur de données synthétiques à grande échelle (COPY).
+
+Remplit une base Postgres DÉDIÉE (POSTGRES_URL, schéma à jour via
+`alembic upgrade head`) avec des volumes réalistes : à l'échelle 1, 1 000
+résidences, ~100 000 résidents et, sur 180 jours, ~1,8 million de passes,
+~1,4 million de scans et ~540 000 pointages de gardiens. Les lignes sont produites à la
+volée et envoyées par COPY, sans passer par l'ORM.
+
+Distributions :
+  - taille des résidences log-normale ; visites proportionnelles au nombre de
+    résidents, plus nombreuses le week-end, pointes 8 h-10 h et 17 h-20 h ;
+  - passes créés de 15 min à un jour avant la visite, durées 1 h à 3 jours ;
+    ~75 % scannés (dont ~7 % refusés), les autres expirent sans scan ;
+  - trois équipes de 8 h par jour et par résidence, le scan revient au
+    gardien de l'équipe en poste.
+
+Déterministe : même --seed, mêmes options et même --end-date donnent les
+mêmes lignes (identifiants compris). Un seul hachage de mot de passe est
+calculé et partagé par tous les comptes.
+
+Avec --manifest, écrit aussi le manifeste de la suite de charge pour les
+--manifest-residences premières résidences (passes en attente compris).
+
+Usage :
+    python -m benchmarks.loadtest.generate --dry-run --scale 2
+    python -m benchmarks.loadtest.generate --truncate --scale 1 --manifest loadtest-dataset.json
+"""
+import argparse
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+# Poids relatifs des visites par heure de la journée
+HOUR_WEIGHTS = (1, 1, 1, 1, 1, 2, 4, 9, 14, 13, 9, 7, 8, 7, 6, 6, 8, 11, 12, 10, 7, 4, 2, 1)
+LEAD_MINUTES = ((15, 3), (60, 4), (240, 2), (1440, 1))
+DURATION_MINUTES = ((60, 3), (240, 4), (720, 2), (1440, 2), (4320, 1))
+SHIFT_HOURS = 8
+
+COLUMNS = {
+    "residences": ("id", "name", "address", "created_at", "updated_at"),
+    "owners": ("id", "name", "phone_number", "email", "password", "created_at", "updated_at", "residence_id"),
+    "guards": ("id", "name", "phone_number", "email", "password", "created_at", "updated_at", "residence_id"),
+    "users": ("id", "name", "phone_number", "password", "appartement", "resident", "created_at", "updated_at",
+              "residence_id"),
+    "form_data": ("id", "name", "phone_number", "qr_code_data", "apartment_number", "created_at", "expires_at",
+                  "duration_minutes", "updated_at", "user_id", "residence_id"),
+    "attendances": ("id", "start_time", "end_time", "created_at", "updated_at", "guard_id"),
+    "guard_qr_scans": ("id", "qr_code_data", "guard_id", "form_data_id", "confirmed", "scanned_at", "created_at",
+                       "updated_at", "residence_id"),
+}
+
+
+def seeded(seed: int, *parts) -> random.Random:
+    # Une graine par (résidence, table) : chaque flux se régénère à l'identique
+    return random.Random(":".join(str(part) for part in (seed, *parts)))
+
+
+def random_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+@dataclass
+class ResidencePlan:
+    index: int
+    id: uuid.UUID
+    residents: int
+    guards: int
+    daily_visits: float
+    user_offset: int
+    guard_offset: int
+
+
+@dataclass
+class People:
+    guards: list
+    residents: list
+
+
+class Generator:
+    def __init__(self, args, password_hash: str, qr_image):
+        self.args = args
+        self.password_hash = password_hash
+        self.qr_image = qr_image
+        self.end = datetime.combine(args.end_date, datetime.min.time())
+        self.start = self.end - timedelta(days=args.history_days)
+        self.plans = self._plans()
+        self.pending = {}
+
+    def _plans(self) -> list[ResidencePlan]:
+        args = self.args
+        rng = seeded(args.seed, "plans")
+        count = max(1, round(args.residences * args.scale))
+        sigma = 0.6
+        mu = math.log(args.residents_per_residence) - sigma ** 2 / 2
+        plans, users, guards = [], 0, 0
+        for index in range(count):
+            residents = max(5, round(rng.lognormvariate(mu, sigma)))
+            guard_count = max(3, min(12, round(args.guards_per_residence * residents / args.residents_per_residence)))
+            plans.append(ResidencePlan(index, random_uuid(rng), residents, guard_count,
+                                       residents * args.visits_per_resident_per_day, users, guards))
+            users += residents
+            guards += guard_count
+        return plans
+
+    def people(self, plan: ResidencePlan) -> People:
+        rng = seeded(self.args.seed, "people", plan.index)
+        guards = [random_uuid(rng) for _ in range(plan.guards)]
+        residents = [(random_uuid(rng), f"{rank // 8 + 1}{rank % 8 + 1:02d}") for rank in range(plan.residents)]
+        return People(guards, residents)
+
+    def on_duty(self, people: People, moment: datetime):
+        day = (moment.date() - self.start.date()).days
+        shift = moment.hour // SHIFT_HOURS
+        return people.guards[(day * (24 // SHIFT_HOURS) + shift) % len(people.guards)]
+
+    # ---------------------------------------------------------------- tables
+
+    def residences(self):
+        for plan in self.plans:
+            created = self.start - timedelta(days=30)
+            yield (plan.id, f"Résidence {plan.index}", f"{plan.index} rue des Données, Dakar", created, created)
+
+    def owners(self):
+        for plan in self.plans:
+            rng = seeded(self.args.seed, "owner", plan.index)
+            created = self.start - timedelta(days=30)
+            yield (random_uuid(rng), f"Gestionnaire {plan.index}", owner_phone(plan.index), None,
+                   self.password_hash, created, created, plan.id)
+
+    def guards(self):
+        for plan in self.plans:
+            created = self.start - timedelta(days=30)
+            for rank, guard_id in enumerate(self.people(plan).guards):
+                yield (guard_id, f"Gardien {plan.index}-{rank}", guard_phone(plan.guard_offset + rank), None,
+                       self.password_hash, created, created, plan.id)
+
+    def users(self):
+        for plan in self.plans:
+            rng = seeded(self.args.seed, "users", plan.index)
+            for rank, (user_id, apartment) in enumerate(self.people(plan).residents):
+                # La plupart des résidents existent avant l'historique, les autres arrivent au fil de l'eau
+                offset = rng.uniform(-60, self.args.history_days) if rng.random() < 0.3 else -60
+                created = self.start + timedelta(days=offset)
+                yield (user_id, f"Résident {plan.index}-{rank}", user_phone(plan.user_offset + rank),
+                       self.password_hash, apartment, "propriétaire", created, created, plan.id)
+
+    def attendances(self):
+        for plan in self.plans:
+            rng = seeded(self.args.seed, "attendances", plan.index)
+            people = self.people(plan)
+            for day in range(self.args.history_days):
+                for shift in range(24 // SHIFT_HOURS):
+                    start = self.start + timedelta(days=day, hours=shift * SHIFT_HOURS,
+                                                   minutes=rng.uniform(-10, 15))
+                    end = start + timedelta(hours=SHIFT_HOURS, minutes=rng.uniform(-15, 20))
+                    yield (random_uuid(rng), start, end, start, end, self.on_duty(people, start + timedelta(hours=1)))
+
+    def visits(self, plan: ResidencePlan, people: People, phones):
+        """Passes (et scans éventuels) d'une résidence, dans un ordre stable."""
+        rng = seeded(self.args.seed, "visits", plan.index)
+        for day in range(self.args.history_days):
+            midnight = self.start + timedelta(days=day)
+            factor = 1.3 if midnight.weekday() >= 5 else 1.0
+            mean = plan.daily_visits * factor
+            count = max(0, round(rng.gauss(mean, math.sqrt(mean))))
+            for _ in range(count):
+                visit = midnight + timedelta(hours=rng.choices(range(24), HOUR_WEIGHTS)[0], minutes=rng.uniform(0, 60))
+                created = visit - timedelta(minutes=weighted(rng, LEAD_MINUTES) * rng.uniform(0.5, 1.0))
+                duration = weighted(rng, DURATION_MINUTES)
+                expires = created + timedelta(minutes=duration)
+                user_id, apartment = rng.choice(people.residents)
+                form_id = random_uuid(rng)
+                form = (form_id, "Visiteur", next(phones), self.qr_image, apartment, created, expires, duration,
+                        created, user_id, plan.id)
+                scan = None
+                if rng.random() < 0.85 and visit <= expires:
+                    scan = (random_uuid(rng), str(form_id), self.on_duty(people, visit), form_id,
+                            rng.random() >= 0.07, visit, visit, visit, plan.id)
+                yield form, scan, False
+
+        # Passes valides jamais scannés, consommés par le scénario gate_rush
+        if plan.index < self.args.manifest_residences:
+            for _ in range(self.args.pending_forms):
+                user_id, apartment = rng.choice(people.residents)
+                created = self.end - timedelta(minutes=rng.uniform(0, 120))
+                yield (random_uuid(rng), "Invité", next(phones), self.qr_image, apartment, created,
+                       self.end + timedelta(days=3), 4320, created, user_id, plan.id), None, True
+
+    def _visit_stream(self):
+        # Parcouru deux fois (passes puis scans) : mêmes graines, mêmes lignes
+        phones = (form_phone(n) for n in range(10 ** 8))
+        for plan in self.plans:
+            for form, scan, pending in self.visits(plan, self.people(plan), phones):
+                yield plan, form, scan, pending
+
+    def form_data(self):
+        self.pending.clear()
+        for plan, form, _, pending in self._visit_stream():
+            if pending:
+                self.pending.setdefault(plan.index, []).append(str(form[0]))
+            yield form
+
+    def guard_qr_scans(self):
+        for _, _, scan, _ in self._visit_stream():
+            if scan is not None:
+                yield scan
+
+    def estimate(self) -> dict:
+        users = sum(plan.residents for plan in self.plans)
+        guards = sum(plan.guards for plan in self.plans)
+        visits = sum(plan.daily_visits for plan in self.plans) * self.args.history_days * (5 + 2 * 1.3) / 7
+        return {
+            "residences": len(self.plans),
+            "owners": len(self.plans),
+            "guards": guards,
+            "users": users,
+            "form_data": round(visits),
+            "attendances": len(self.plans) * self.args.history_days * (24 // SHIFT_HOURS),
+            # 85 % des visiteurs se présentent, certains après l'expiration du passe
+            "guard_qr_scans": round(visits * 0.75),
+        }
+
+
+def owner_phone(index: int) -> str:
+    return f"+22171{index:07d}"
+
+
+def guard_phone(number: int) -> str:
+    return f"+22170{number:07d}"
+
+
+def user_phone(number: int) -> str:
+    return f"+22176{number:07d}"
+
+
+def form_phone(number: int) -> str:
+    return f"+2218{number:08d}"
+
+
+# ------------------------------------------------------------------- COPY
+
+def copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class RowStream:
+    """Fichier en lecture seule alimenté par un générateur de lignes, pour
+    copy_expert : rien n'est matérialisé en mémoire au-delà d'un bloc."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = b""
+        self.count = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunks, length = [self._buffer], len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = ("\t".join(copy_value(value) for value in row) + "\n").encode("utf-8")
+            chunks.append(line)
+            length += len(line)
+            self.count += 1
+        data = b"".join(chunks)
+        if size < 0 or len(data) <= size:
+            self._buffer = b""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    readline = read
+
+
+def copy_table(connection, table: str, rows) -> int:
+    stream = RowStream(rows)
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(COLUMNS[table])}) FROM STDIN", stream, size=1 << 20)
+    connection.commit()
+    elapsed = time.perf_counter() - started
+    print(f"  {table:<15} {stream.count:>11,} lignes  {elapsed:7.1f} s  {stream.count / max(elapsed, 1e-9):>9,.0f} lignes/s")
+    return stream.count
+
+
+def write_manifest(generator: Generator, path: str):
+    residences = []
+    for plan in generator.plans[:generator.args.manifest_residences]:
+        rng = seeded(generator.args.seed, "owner", plan.index)
+        residences.append({
+            "id": str(plan.id),
+            "owner": {"id": str(random_uuid(rng)), "phone": owner_phone(plan.index)},
+            "guards": [guard_phone(plan.guard_offset + rank) for rank in range(plan.guards)],
+            "residents": [user_phone(plan.user_offset + rank) for rank in range(plan.residents)],
+            "pending_forms": generator.pending.get(plan.index, []),
+        })
+    manifest = {
+        "seed": generator.args.seed,
+        "created_at": generator.end.isoformat(),
+        "password": generator.args.password,
+        "history_days": generator.args.history_days,
+        "residences": residences,
+    }
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump(manifest, output, indent=2)
+    print(f"manifeste : {path}")
+
+
+def main(args):
+    # Les imports de l'application (et de psycopg2) ne sont nécessaires qu'au chargement
+    if args.dry_run:
+        generator = Generator(args, "", None)
+        for table, count in generator.estimate().items():
+            print(f"  {table:<15} ~{count:>11,}")
+        return
+
+    from sqlalchemy import text
+
+    from app.partitions import create_partitions
+    from app.postgres_connect import init_engine
+    from app.utils import generate_qr_code_base64, hashed
+
+    # Un seul hachage partagé : aucun bcrypt/argon2 par ligne
+    password_hash = args.password_hash or hashed(args.password)
+    qr_image = generate_qr_code_base64("welqo-synthetic") if args.qr_images else None
+    generator = Generator(args, password_hash, qr_image)
+
+    engine = init_engine()
+    connection = engine.raw_connection()
+    try:
+        if args.truncate:
+            with connection.cursor() as cursor:
+                # CASCADE vide aussi les tables qui en dépendent (comptes, passes, scans, rapports)
+                cursor.execute("TRUNCATE refresh_tokens, residences CASCADE")
+            connection.commit()
+        # Une partition de scans par mois d'historique, sinon tout irait dans la partition par défaut
+        with engine.begin() as conn:
+            create_partitions(conn, generator.start.date(), generator.end.date())
+
+        started = time.perf_counter()
+        for table in ("residences", "owners", "guards", "users", "form_data", "attendances", "guard_qr_scans"):
+            copy_table(connection, table, getattr(generator, table)())
+        print(f"chargement : {time.perf_counter() - started:.0f} s")
+    finally:
+        connection.close()
+
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {', '.join(COLUMNS)}"))
+
+    if args.manifest:
+        write_manifest(generator, args.manifest)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplie le nombre de résidences")
+    parser.add_argument("--residences", type=int, default=1000, help="à l'échelle 1")
+    parser.add_argument("--residents-per-residence", type=int, default=100, help="moyenne")
+    parser.add_argument("--guards-per-residence", type=int, default=6, help="moyenne")
+    parser.add_argument("--visits-per-resident-per-day", type=float, default=0.1)
+    parser.add_argument("--history-days", type=int, default=180)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(),
+                        help="fin de l'historique (AAAA-MM-JJ), à fixer pour rejouer à l'identique")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--password-hash", default=None, help="hachage précalculé (sinon calculé une fois)")
+    parser.add_argument("--qr-images", action="store_true",
+                        help="stocker une image QR base64 dans chaque passe (lignes de taille réaliste)")
+    parser.add_argument("--truncate", action="store_true", help="vider les tables de l'application avant")
+    parser.add_argument("--dry-run", action="store_true", help="afficher les volumes estimés sans rien écrire")
+    parser.add_argument("--manifest", default=None, help="écrire le manifeste de la suite de charge")
+    parser.add_argument("--manifest-residences", type=int, default=5)
+    parser.add_argument("--pending-forms", type=int, default=300, help="par résidence du manifeste")
+    main(parser.parse_args())
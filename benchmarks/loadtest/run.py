@@ -0,0 +1,117 @@
+"""Suite de charge : exécute les scénarios sur une API lancée localement.
+
+Préparer la base avec `python -m benchmarks.loadtest.seed --truncate`, lancer
+l'API (`python -m app.server`), puis :
+
+    python -m benchmarks.loadtest.run --dataset loadtest-dataset.json
+    python -m benchmarks.loadtest.run --scenarios gate_rush report_generation
+    python -m benchmarks.loadtest.run --compare loadtest-results/<commit de référence>.json
+
+Affiche p50/p95/p99 et débit par opération et écrit le résultat en JSON
+(par défaut loadtest-results/<commit>.json) ; --compare le confronte à un
+résultat précédent et sort en 1 en cas de régression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+import httpx
+
+from benchmarks.loadtest import compare
+from benchmarks.loadtest.scenarios import SCENARIOS, Context
+from benchmarks.loadtest.stats import print_summary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+    return f"{commit}-dirty" if dirty else commit
+
+
+async def run_scenarios(args, dataset) -> dict:
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    results = {}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        for name in args.scenarios:
+            ctx = Context(client=client, dataset=dataset, args=args)
+            await SCENARIOS[name](ctx)
+            results[name] = ctx.recorder.summary()
+            print_summary(name, results[name])
+    return results
+
+
+def main(args) -> int:
+    with open(args.dataset, encoding="utf-8") as source:
+        dataset = json.load(source)
+    passes = len(dataset["residences"]) * args.pass_creators * args.passes_per_resident
+    if "bulk_pass_creation" in args.scenarios and passes > 10_000:
+        raise SystemExit("bulk_pass_creation : au plus 10 000 passes par exécution")
+
+    commit = git_commit()
+    scenarios = asyncio.run(run_scenarios(args, dataset))
+    result = {
+        "meta": {
+            "commit": commit,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "python": platform.python_version(),
+            "dataset_seed": dataset.get("seed"),
+            "residences": len(dataset["residences"]),
+            "options": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        },
+        "scenarios": scenarios,
+    }
+
+    output = args.output or os.path.join("loadtest-results", f"{commit}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as target:
+        json.dump(result, target, indent=2)
+    print(f"\nrésultat : {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as source:
+            baseline = json.load(source)
+        print()
+        return compare.report(compare.compare(baseline, result, args.threshold, args.min_delta_ms))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--dataset", default="loadtest-dataset.json")
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, metavar="BASELINE", help="résultat JSON de référence")
+    compare.add_arguments(parser)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    # gate_rush
+    parser.add_argument("--gate-guards", type=int, default=4, help="gardiens actifs par résidence")
+    parser.add_argument("--gate-passes", type=int, default=200, help="passes scannés par résidence")
+    # login_storm
+    parser.add_argument("--storm-rounds", type=int, default=3)
+    # dashboard_polling
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--pollers", type=int, default=3, help="gardiens et résidents par résidence")
+    # bulk_pass_creation
+    parser.add_argument("--pass-creators", type=int, default=10, help="résidents par résidence")
+    parser.add_argument("--passes-per-resident", type=int, default=10)
+    # report_generation
+    parser.add_argument("--report-residences", type=int, default=2)
+    parser.add_argument("--report-concurrency", type=int, default=4)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,196 @@
+"""Scénarios de charge calqués sur le trafic réel des résidences.
+
+Chaque scénario reçoit un Context (client httpx, manifeste, options) et
+enregistre ses mesures dans ctx.recorder ; les connexions nécessaires à la
+mise en place ne sont pas mesurées, sauf dans login_storm.
+"""
+import asyncio
+import secrets
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks.loadtest.stats import Recorder
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    dataset: dict
+    args: object
+    recorder: Recorder = field(default_factory=Recorder)
+    tokens: dict = field(default_factory=dict)
+
+
+async def login(ctx: Context, role: str, phone: str) -> str:
+    key = (role, phone)
+    if key not in ctx.tokens:
+        response = await ctx.client.post(f"/{role}/login", data={"username": phone,
+                                                                   "password": ctx.dataset["password"]})
+        response.raise_for_status()
+        ctx.tokens[key] = response.json()["access_token"]
+    return ctx.tokens[key]
+
+
+async def auth_headers(ctx: Context, role: str, phone: str) -> dict:
+    return {"Authorization": f"Bearer {await login(ctx, role, phone)}"}
+
+
+async def gate_rush(ctx: Context):
+    """Ruée du matin : dans chaque résidence, les gardiens enchaînent scan puis
+    confirmation sur la file des passes en attente, sans temps mort."""
+    args, recorder = ctx.args, ctx.recorder
+    residences = []
+    for residence in ctx.dataset["residences"]:
+        guards = residence["guards"][:args.gate_guards]
+        guard_headers = [await auth_headers(ctx, "guard", phone) for phone in guards]
+        queue = asyncio.Queue()
+        for form_id in residence["pending_forms"][:args.gate_passes]:
+            queue.put_nowait(form_id)
+        residences.append((guard_headers, queue))
+
+    async def guard_worker(headers, queue):
+        while True:
+            try:
+                form_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await recorder.timed("scan", ctx.client.post("/guard-scans/scan", json={"form_id": form_id},
+                                                         headers=headers))
+            await recorder.timed("confirm", ctx.client.post("/guard-scans/confirm",
+                                                            json={"form_id": form_id, "confirmed": True},
+                                                            headers=headers))
+
+    recorder.start()
+    await asyncio.gather(*(guard_worker(headers, queue)
+                           for guard_headers, queue in residences for headers in guard_headers))
+    recorder.stop()
+
+
+async def login_storm(ctx: Context):
+    """Relève des gardiens : tous se connectent en même temps, puis se
+    déconnectent, --storm-rounds fois."""
+    guards = [phone for residence in ctx.dataset["residences"] for phone in residence["guards"]]
+    recorder = ctx.recorder
+
+    async def relief(phone):
+        response = await recorder.timed("guard_login", ctx.client.post(
+            "/guard/login", data={"username": phone, "password": ctx.dataset["password"]}))
+        if response is not None and response.status_code == 200:
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            await recorder.timed("guard_logout", ctx.client.post("/guard/logout", headers=headers))
+
+    recorder.start()
+    for _ in range(ctx.args.storm_rounds):
+        await asyncio.gather(*(relief(phone) for phone in guards))
+    recorder.stop()
+
+
+async def dashboard_polling(ctx: Context):
+    """Tableaux de bord ouverts : gardiens, gestionnaires et résidents
+    rafraîchissent leur écran toutes les --poll-interval secondes."""
+    args, recorder = ctx.args, ctx.recorder
+    pollers = []
+    for residence in ctx.dataset["residences"]:
+        for phone in residence["guards"][:args.pollers]:
+            headers = await auth_headers(ctx, "guard", phone)
+            pollers.append([
+                ("guard_residence_stats", "/guard-scans/residence/stats", headers),
+                ("guard_residence_scans", "/guard-scans/residence/scans?limit=50", headers),
+                ("guard_stats", "/guard-scans/stats", headers),
+            ])
+        owner_headers = await auth_headers(ctx, "owner", residence["owner"]["phone"])
+        pollers.append([
+            ("owner_reports", "/owners/my-reports", owner_headers),
+            ("owner_statistics", f"/reports/statistics?residence_id={residence['id']}", owner_headers),
+        ])
+        for phone in residence["residents"][:args.pollers]:
+            pollers.append([("user_forms", "/forms/user-forms", await auth_headers(ctx, "user", phone))])
+
+    async def poll(requests, deadline):
+        etags = {}
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            for name, path, headers in requests:
+                # Comme un navigateur : If-None-Match avec l'ETag reçu
+                request_headers = dict(headers)
+                if path in etags:
+                    request_headers["If-None-Match"] = etags[path]
+                response = await recorder.timed(name, ctx.client.get(path, headers=request_headers))
+                if response is not None and "etag" in response.headers:
+                    etags[path] = response.headers["etag"]
+            await asyncio.sleep(max(0.0, args.poll_interval - (time.perf_counter() - started)))
+
+    recorder.start()
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(poll(requests, deadline) for requests in pollers))
+    recorder.stop()
+
+
+async def bulk_pass_creation(ctx: Context):
+    """Création de passes en masse (événement, réception) par les résidents."""
+    args, recorder = ctx.args, ctx.recorder
+    residents = [phone for residence in ctx.dataset["residences"]
+                 for phone in residence["residents"][:args.pass_creators]]
+    headers = [await auth_headers(ctx, "user", phone) for phone in residents]
+    # Numéros de visiteurs propres à cette exécution (phone_number est unique)
+    block = secrets.randbelow(1000) * 10_000
+    counter = iter(range(block, block + 10_000))
+
+    async def create(resident_headers):
+        for _ in range(args.passes_per_resident):
+            payload = {"name": "Visiteur charge", "phone_number": f"+22179{next(counter):07d}",
+                       "duration_minutes": 240, "apartment_number": "A1"}
+            await recorder.timed("create_form", ctx.client.post("/forms/create-form", json=payload,
+                                                                headers=resident_headers))
+
+    recorder.start()
+    await asyncio.gather(*(create(resident_headers) for resident_headers in headers))
+    recorder.stop()
+
+
+REPORT_TYPES = ("activity_report", "security_report", "qr_code_report", "user_report")
+
+
+async def report_generation(ctx: Context):
+    """Rapports PDF sur tout l'historique : une génération (titre unique, hors
+    cache) puis la même demande servie par le cache."""
+    args, recorder = ctx.args, ctx.recorder
+    date_to = datetime.now()
+    date_from = date_to - timedelta(days=ctx.dataset["history_days"])
+    run_id = secrets.token_hex(4)
+    jobs = []
+    for residence in ctx.dataset["residences"][:args.report_residences]:
+        headers = await auth_headers(ctx, "owner", residence["owner"]["phone"])
+        for report_type in REPORT_TYPES:
+            jobs.append((headers, {
+                "title": f"Charge {run_id} {report_type}",
+                "owner_id": residence["owner"]["id"],
+                "report_type": report_type,
+                "date_from": date_from.isoformat(),
+                "date_to": date_to.isoformat(),
+            }))
+
+    semaphore = asyncio.Semaphore(args.report_concurrency)
+
+    async def generate(headers, payload):
+        async with semaphore:
+            await recorder.timed(f"report_{payload['report_type']}",
+                                 ctx.client.post("/reports/create-reports", json=payload, headers=headers))
+            await recorder.timed("report_cached",
+                                 ctx.client.post("/reports/create-reports", json=payload, headers=headers))
+
+    recorder.start()
+    await asyncio.gather(*(generate(headers, payload) for headers, payload in jobs))
+    recorder.stop()
+
+
+SCENARIOS = {
+    "gate_rush": gate_rush,
+    "login_storm": login_storm,
+    "dashboard_polling": dashboard_polling,
+    "bulk_pass_creation": bulk_pass_creation,
+    "report_generation": report_generation,
+}
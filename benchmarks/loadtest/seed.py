@@ -0,0 +1,173 @@
+"""Jeu de données de la suite de charge.
+
+Remplit une base Postgres DÉDIÉE (POSTGRES_URL, schéma à jour via
+`alembic upgrade head`) puis écrit le manifeste lu par `run` : comptes,
+mot de passe commun, passes en attente pour la ruée du matin.
+
+Même --seed, mêmes paramètres : mêmes données (à l'exception des identifiants
+et des dates, relatives au moment du chargement). Les passes en attente sont
+consommées par gate_rush : recharger avec --truncate avant chaque mesure
+comparable. Pour des volumes de production, voir generate.
+
+Usage :
+    python -m benchmarks.loadtest.seed --truncate --output loadtest-dataset.json
+    python -m benchmarks.loadtest.seed --residences 20 --history-days 365 --scans-per-day 400
+"""
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app.models.data import Attendance, FormData, Guard, GuardQRScan, Owner, Residence, User
+from app.partitions import create_partitions
+from app.postgres_connect import SessionLocal, init_engine
+from app.utils import hashed
+
+TABLES = ("refresh_tokens", "reports", "guard_qr_scans", "attendances", "form_data", "guards", "owners",
+          "users", "residences")
+
+CHUNK = 5000
+
+# Numéros sénégalais (+221 suivi de 9 chiffres) : 7, type de compte, résidence, rang
+KIND_GUARD, KIND_OWNER, KIND_RESIDENT, KIND_HISTORY, KIND_PENDING = range(5)
+
+
+def phone(kind: int, residence: int, rank: int) -> str:
+    return f"+2217{kind}{residence:02d}{rank:05d}"
+
+
+def bulk_insert(db, model, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.execute(insert(model), rows[start:start + CHUNK])
+
+
+def seed_residence(db, rng, index, args, password_hash, now):
+    residence_id = uuid.uuid4()
+    db.execute(insert(Residence), [{
+        "id": residence_id, "name": f"Résidence {index}", "address": f"{index} avenue de la Charge, Dakar",
+        "created_at": now - timedelta(days=args.history_days),
+    }])
+
+    owner_id = uuid.uuid4()
+    db.execute(insert(Owner), [{
+        "id": owner_id, "name": f"Gestionnaire {index}", "phone_number": phone(KIND_OWNER, index, 0),
+        "password": password_hash, "residence_id": residence_id,
+    }])
+
+    guards = [{"id": uuid.uuid4(), "name": f"Gardien {index}-{rank}", "phone_number": phone(KIND_GUARD, index, rank),
+               "password": password_hash, "residence_id": residence_id} for rank in range(args.guards)]
+    bulk_insert(db, Guard, guards)
+
+    residents = [{
+        "id": uuid.uuid4(), "name": f"Résident {index}-{rank}", "phone_number": phone(KIND_RESIDENT, index, rank),
+        "password": password_hash, "appartement": f"{rank // 10 + 1}{rank % 10:02d}", "resident": "propriétaire",
+        "residence_id": residence_id, "created_at": now - timedelta(days=rng.uniform(0, args.history_days)),
+    } for rank in range(args.residents)]
+    bulk_insert(db, User, residents)
+
+    # Historique : un passe par visite, scanné entre 7 h et 21 h, pointe le matin
+    forms, scans, attendances = [], [], []
+    rank = 0
+    for day in range(args.history_days, 0, -1):
+        date = (now - timedelta(days=day)).replace(hour=0, minute=0, second=0, microsecond=0)
+        for guard in guards[:2]:
+            start = date + timedelta(hours=rng.choice((6, 14)))
+            attendances.append({"id": uuid.uuid4(), "guard_id": guard["id"], "start_time": start,
+                                "end_time": start + timedelta(hours=8), "created_at": start,
+                                "updated_at": start + timedelta(hours=8)})
+        for _ in range(args.scans_per_day):
+            hour = min(20.99, max(7.0, rng.gauss(9.5, 3.0)))
+            scanned_at = date + timedelta(hours=hour)
+            created_at = scanned_at - timedelta(minutes=rng.randint(5, 600))
+            resident = rng.choice(residents)
+            form_id = uuid.uuid4()
+            forms.append({
+                "id": form_id, "name": f"Visiteur {rank}", "phone_number": phone(KIND_HISTORY, index, rank),
+                "apartment_number": resident["appartement"], "qr_code_data": None, "created_at": created_at,
+                "expires_at": created_at + timedelta(minutes=720), "duration_minutes": 720,
+                "user_id": resident["id"], "residence_id": residence_id,
+            })
+            scans.append({
+                "id": uuid.uuid4(), "qr_code_data": str(form_id), "guard_id": rng.choice(guards)["id"],
+                "form_data_id": form_id, "residence_id": residence_id, "confirmed": rng.random() > 0.08,
+                "scanned_at": scanned_at, "created_at": scanned_at, "updated_at": scanned_at,
+            })
+            rank += 1
+
+    pending = []
+    for rank in range(args.pending_forms):
+        resident = rng.choice(residents)
+        pending.append({
+            "id": uuid.uuid4(), "name": f"Invité {rank}", "phone_number": phone(KIND_PENDING, index, rank),
+            "apartment_number": resident["appartement"], "qr_code_data": None, "created_at": now,
+            "expires_at": now + timedelta(days=2), "duration_minutes": 2880, "user_id": resident["id"],
+            "residence_id": residence_id,
+        })
+
+    bulk_insert(db, FormData, forms + pending)
+    bulk_insert(db, GuardQRScan, scans)
+    bulk_insert(db, Attendance, attendances)
+    db.commit()
+
+    return {
+        "id": str(residence_id),
+        "owner": {"id": str(owner_id), "phone": phone(KIND_OWNER, index, 0)},
+        "guards": [guard["phone_number"] for guard in guards],
+        "residents": [resident["phone_number"] for resident in residents],
+        "pending_forms": [str(form["id"]) for form in pending],
+        "history_scans": len(scans),
+    }
+
+
+def main(args):
+    if args.residences > 100 or args.history_days * args.scans_per_day >= 100_000 or args.pending_forms >= 100_000:
+        raise SystemExit("Au plus 100 résidences et 99 999 passes par résidence (format des numéros)")
+    rng = random.Random(args.seed)
+    # Un seul hachage pour tous les comptes : le coût bcrypt/argon2 se paie à la
+    # connexion, pas au chargement
+    password_hash = hashed(args.password)
+    now = datetime.now()
+
+    init_engine()
+    db = SessionLocal()
+    try:
+        if args.truncate:
+            db.execute(text(f"TRUNCATE {', '.join(TABLES)} CASCADE"))
+        # Une partition de scans par mois d'historique
+        create_partitions(db.connection(), (now - timedelta(days=args.history_days)).date(), now.date())
+        db.commit()
+        residences = []
+        for index in range(args.residences):
+            residences.append(seed_residence(db, rng, index, args, password_hash, now))
+            print(f"résidence {index + 1}/{args.residences} : {residences[-1]['history_scans']} scans historiques")
+    finally:
+        db.close()
+
+    manifest = {
+        "seed": args.seed,
+        "created_at": now.isoformat(),
+        "password": args.password,
+        "history_days": args.history_days,
+        "residences": residences,
+    }
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(manifest, output, indent=2)
+    print(f"manifeste : {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--residences", type=int, default=5)
+    parser.add_argument("--guards", type=int, default=6, help="gardiens par résidence")
+    parser.add_argument("--residents", type=int, default=100, help="résidents par résidence")
+    parser.add_argument("--pending-forms", type=int, default=300, help="passes valides à scanner, par résidence")
+    parser.add_argument("--history-days", type=int, default=90)
+    parser.add_argument("--scans-per-day", type=int, default=150, help="par résidence")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--truncate", action="store_true", help="vider les tables de l'application avant")
+    parser.add_argument("--output", default="loadtest-dataset.json")
+    main(parser.parse_args())
@@ -0,0 +1,62 @@
+import statistics
+import time
+from collections import defaultdict
+
+from benchmarks.percentiles import percentile
+
+
+class Recorder:
+    """Latences et erreurs d'un scénario, par opération (scan, confirm...)."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    async def timed(self, name, request, ok_statuses=(200, 201, 304)):
+        """Exécute la coroutine `request` (réponse httpx) et enregistre sa durée."""
+        start = time.perf_counter()
+        try:
+            response = await request
+        except Exception as e:
+            self.errors[name][type(e).__name__] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        if response.status_code not in ok_statuses:
+            self.errors[name][str(response.status_code)] += 1
+            return response
+        self.latencies[name].append(elapsed)
+        return response
+
+    def summary(self) -> dict:
+        duration = (self.finished or time.perf_counter()) - self.started
+        result = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            ms = [value * 1000 for value in self.latencies[name]]
+            result[name] = {
+                "count": len(ms),
+                "errors": dict(self.errors[name]),
+                "throughput_rps": len(ms) / duration if duration > 0 else 0.0,
+                "p50_ms": percentile(ms, 50),
+                "p95_ms": percentile(ms, 95),
+                "p99_ms": percentile(ms, 99),
+                "mean_ms": statistics.fmean(ms) if ms else 0.0,
+                "max_ms": max(ms) if ms else 0.0,
+            }
+        return {"duration_s": duration, "operations": result}
+
+
+def print_summary(scenario: str, summary: dict):
+    print(f"\n{scenario} ({summary['duration_s']:.1f} s)")
+    for name, row in summary["operations"].items():
+        errors = sum(row["errors"].values())
+        print(f"  {name:<22} n={row['count']:<7} {row['throughput_rps']:8.1f} req/s  "
+              f"p50={row['p50_ms']:7.1f}ms p95={row['p95_ms']:7.1f}ms p99={row['p99_ms']:7.1f}ms"
+              + (f"  erreurs={errors} {row['errors']}" if errors else ""))
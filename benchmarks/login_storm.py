@@ -0,0 +1,91 @@
+"""Latence des scans pendant une tempête de connexions (relève des gardiens).
+
+Mesure la latence de /guard-scans/scan au repos, puis pendant que N clients
+enchaînent des connexions /guard/login. Avec le hachage dans un pool dédié,
+les percentiles des deux phases doivent rester proches.
+
+Complète le scénario login_storm de la suite de charge (benchmarks.loadtest),
+qui mesure la latence des connexions elles-mêmes sur un jeu de données
+complet : ici, c'est l'effet de la tempête sur les autres routes qui compte,
+avec un seul compte et sans jeu de données.
+
+Usage :
+    python benchmarks/login_storm.py --base-url http://localhost:8000/api/v1 \\
+        --guard-phone +221770000000 --guard-password secret --form-id <uuid>
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.percentiles import percentile  # noqa: E402
+
+
+def summary(name, latencies):
+    ms = [v * 1000 for v in latencies]
+    print(f"{name:<14} n={len(ms):<6} p50={percentile(ms, 50):7.1f}ms "
+          f"p95={percentile(ms, 95):7.1f}ms p99={percentile(ms, 99):7.1f}ms "
+          f"mean={statistics.fmean(ms) if ms else 0:7.1f}ms")
+
+
+async def login(client, phone, password):
+    response = await client.post("/guard/login", data={"username": phone, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def scan_loop(client, token, form_id, duration, latencies):
+    headers = {"Authorization": f"Bearer {token}"}
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.post("/guard-scans/scan", json={"form_id": form_id}, headers=headers)
+        latencies.append(time.perf_counter() - start)
+
+
+async def login_loop(client, phone, password, stop, counters):
+    while not stop.is_set():
+        response = await client.post("/guard/login", data={"username": phone, "password": password})
+        counters[response.status_code] = counters.get(response.status_code, 0) + 1
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.storm_clients + args.scan_clients + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        token = await login(client, args.guard_phone, args.guard_password)
+
+        idle = []
+        await asyncio.gather(*(scan_loop(client, token, args.form_id, args.duration, idle)
+                               for _ in range(args.scan_clients)))
+
+        storm = []
+        counters = {}
+        stop = asyncio.Event()
+        storm_tasks = [asyncio.create_task(login_loop(client, args.guard_phone, args.guard_password, stop, counters))
+                       for _ in range(args.storm_clients)]
+        await asyncio.gather(*(scan_loop(client, token, args.form_id, args.duration, storm)
+                               for _ in range(args.scan_clients)))
+        stop.set()
+        await asyncio.gather(*storm_tasks)
+
+    summary("scan (repos)", idle)
+    summary("scan (tempête)", storm)
+    print("logins:", ", ".join(f"{code}={count}" for code, count in sorted(counters.items())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--guard-phone", required=True)
+    parser.add_argument("--guard-password", required=True)
+    parser.add_argument("--form-id", required=True)
+    parser.add_argument("--duration", type=float, default=15.0, help="durée de chaque phase (s)")
+    parser.add_argument("--scan-clients", type=int, default=4)
+    parser.add_argument("--storm-clients", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
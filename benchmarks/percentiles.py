@@ -0,0 +1,10 @@
+"""Percentiles communs aux benchmarks et à la suite de charge."""
+
+
+def percentile(values, q):
+    """Percentile q (0-100) au rang le plus proche ; 0.0 sans mesure."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
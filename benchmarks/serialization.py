@@ -0,0 +1,94 @@
+"""Coût de sérialisation des grandes listes, par schéma.
+
+Pour chaque schéma, compare trois chemins sur la même liste d'objets de type ORM :
+  - json      : validation + jsonable_encoder + json.dumps (ancien JSONResponse)
+  - orjson    : validation + jsonable_encoder + orjson (ORJSONResponse par défaut)
+  - fast path : fast_list_response (validation + dump_json dans pydantic-core)
+
+Usage :
+    python benchmarks/serialization.py --items 500 --repeat 20
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.schemas.data import FormDataResponse  # noqa: E402
+from app.schemas.guard import GuardOut  # noqa: E402
+from app.schemas.qrcode import GuardQRScanOut  # noqa: E402
+from app.serialization import fast_list_response  # noqa: E402
+
+
+def make_user(i):
+    return SimpleNamespace(id=uuid.uuid4(), name=f"Résident {i}", phone_number=f"+22177{i:07d}",
+                           appartement=f"A{i % 300}", resident="welqo", created_at=datetime.now())
+
+
+def make_form(i):
+    now = datetime.now()
+    return SimpleNamespace(
+        id=uuid.uuid4(), name=f"Visiteur {i}", phone_number=f"+22178{i:07d}", apartment_number=f"B{i % 50}",
+        # Taille typique d'un QR code PNG encodé en base64
+        qr_code_data=base64.b64encode(os.urandom(1100)).decode(),
+        created_at=now, expires_at=now + timedelta(hours=2), user=make_user(i),
+    )
+
+
+def make_scan(i):
+    now = datetime.now()
+    return GuardQRScanOut(
+        id=uuid.uuid4(), form_id=uuid.uuid4(), guard_id=uuid.uuid4(), confirmed=i % 3 != 0,
+        scanned_at=now, created_at=now, updated_at=now, visitor_name=f"Visiteur {i}",
+        visitor_phone=f"+22178{i:07d}", resident_name=f"Résident {i}", resident_phone=f"+22177{i:07d}",
+        resident_apartment=f"A{i % 300}", expires_at=now + timedelta(hours=2), valid=True,
+    )
+
+
+def make_guard(i):
+    return SimpleNamespace(id=uuid.uuid4(), name=f"Gardien {i}", email=None, phone_number=f"+22176{i:07d}",
+                           created_at=datetime.now(), residence_id=uuid.uuid4())
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = func()
+    return (time.perf_counter() - start) / repeat * 1000, len(body)
+
+
+def bench(schema, items, repeat):
+    def validated():
+        return [schema.model_validate(item, from_attributes=True) for item in items]
+
+    paths = {
+        "json": lambda: json.dumps(jsonable_encoder(validated())).encode(),
+        "orjson": lambda: orjson.dumps(jsonable_encoder(validated())),
+        "fast path": lambda: fast_list_response(schema, items).body,
+    }
+    for name, func in paths.items():
+        ms, size = timed(func, repeat)
+        print(f"{schema.__name__:<18} {name:<10} {ms:8.2f} ms  ({size / 1024:.0f} Kio)")
+
+
+def main(args):
+    n = args.items
+    bench(FormDataResponse, [make_form(i) for i in range(n)], args.repeat)
+    bench(GuardQRScanOut, [make_scan(i) for i in range(n)], args.repeat)
+    bench(GuardOut, [make_guard(i) for i in range(n)], args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,69 @@
+"""Débit et latence du serveur à concurrence croissante.
+
+Envoie des requêtes en boucle fermée (chaque client renvoie dès la réponse
+reçue) pendant --duration secondes pour chaque niveau de --concurrency, et
+affiche requêtes/s et percentiles. Par défaut sur `/` (sans base de données) ;
+--path et --token permettent de viser une route authentifiée.
+
+Usage :
+    python -m app.server &
+    python benchmarks/throughput.py --base-url http://localhost:8000 --concurrency 1 16 64 256
+    python benchmarks/throughput.py --path /api/v1/guards/profile --token <jwt>
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.percentiles import percentile  # noqa: E402
+
+
+async def client_loop(client, path, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_level(args, concurrency):
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=30) as client:
+        latencies, errors = [], []
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(client_loop(client, args.path, deadline, latencies, errors)
+                               for _ in range(concurrency)))
+
+    ms = [v * 1000 for v in latencies]
+    print(f"c={concurrency:<5} {len(ms) / args.duration:9.0f} req/s  "
+          f"p50={percentile(ms, 50):7.1f}ms p95={percentile(ms, 95):7.1f}ms "
+          f"p99={percentile(ms, 99):7.1f}ms mean={statistics.fmean(ms) if ms else 0:7.1f}ms  "
+          f"erreurs={len(errors)}")
+
+
+async def main(args):
+    for concurrency in args.concurrency:
+        await run_level(args, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 16, 64, 256])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,34 @@
+"""add report cache key
+
+Revision ID: 4f2a8d61b9e0
+Revises: c3e91f07a2d4
+Create Date: 2025-09-16 09:41:27.113604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2a8d61b9e0'
+down_revision: Union[str, None] = 'c3e91f07a2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('reports', sa.Column('cache_key', sa.String(length=64), nullable=True))
+    op.add_column('reports', sa.Column('date_from', sa.DateTime(), nullable=True))
+    op.add_column('reports', sa.Column('date_to', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_reports_cache_key'), 'reports', ['cache_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_reports_cache_key'), table_name='reports')
+    op.drop_column('reports', 'date_to')
+    op.drop_column('reports', 'date_from')
+    op.drop_column('reports', 'cache_key')
@@ -0,0 +1,126 @@
+"""partition guard_qr_scans by month
+
+Revision ID: a5d8f3c1e947
+Revises: e1a4c7b92f35
+Create Date: 2025-10-06 09:41:17.204318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d8f3c1e947'
+down_revision: Union[str, None] = 'e1a4c7b92f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = 'id, qr_code_data, guard_id, form_data_id, confirmed, scanned_at, created_at, updated_at'
+
+# Crée la partition mensuelle contenant `month` (guard_qr_scans_AAAA_MM) si elle
+# n'existe pas. Les lignes tombées entre-temps dans la partition par défaut
+# pour ce mois y sont déplacées avant l'attachement. Le verrou consultatif
+# sérialise les workers qui démarrent en même temps.
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION guard_qr_scans_create_partition(month date) RETURNS text AS $$
+DECLARE
+    start_at timestamp := date_trunc('month', month);
+    end_at timestamp := date_trunc('month', month) + interval '1 month';
+    partition_name text := 'guard_qr_scans_' || to_char(month, 'YYYY_MM');
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('guard_qr_scans_create_partition'));
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE guard_qr_scans INCLUDING DEFAULTS)', partition_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM guard_qr_scans_default WHERE scanned_at >= %L AND scanned_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        start_at, end_at, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE guard_qr_scans ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_at, end_at
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # L'ancienne table est conservée le temps de la copie ; ses index sont
+    # renommés pour libérer les noms
+    op.rename_table('guard_qr_scans', 'guard_qr_scans_legacy')
+    op.execute('ALTER INDEX guard_qr_scans_pkey RENAME TO guard_qr_scans_legacy_pkey')
+    for index in ('ix_guard_qr_scans_id', 'ix_guard_qr_scans_scanned_at', 'ix_guard_qr_scans_guard_id_scanned_at'):
+        op.execute(f'ALTER INDEX {index} RENAME TO {index}_legacy')
+
+    # La clé de partition doit faire partie de la clé primaire
+    op.execute("""
+        CREATE TABLE guard_qr_scans (
+            id UUID NOT NULL,
+            qr_code_data TEXT NOT NULL,
+            guard_id UUID NOT NULL REFERENCES guards (id),
+            form_data_id UUID REFERENCES form_data (id),
+            confirmed BOOLEAN,
+            scanned_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT guard_qr_scans_pkey PRIMARY KEY (id, scanned_at)
+        ) PARTITION BY RANGE (scanned_at)
+    """)
+    # Filet de sécurité : un scan hors des partitions créées n'échoue jamais
+    op.execute('CREATE TABLE guard_qr_scans_default PARTITION OF guard_qr_scans DEFAULT')
+
+    # BRIN : quelques pages pour toute la table, les scans arrivant dans l'ordre
+    # chronologique ; remplace le B-tree sur scanned_at
+    op.create_index('ix_guard_qr_scans_scanned_at_brin', 'guard_qr_scans', ['scanned_at'],
+                    postgresql_using='brin')
+    op.create_index('ix_guard_qr_scans_guard_id_scanned_at', 'guard_qr_scans', ['guard_id', 'scanned_at'])
+    op.create_index('ix_guard_qr_scans_form_data_id', 'guard_qr_scans', ['form_data_id'])
+
+    op.execute(CREATE_PARTITION_FUNCTION)
+
+    # Une partition par mois présent dans l'historique, plus le mois courant et les trois suivants
+    op.execute("""
+        SELECT guard_qr_scans_create_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', LEAST((SELECT min(scanned_at) FROM guard_qr_scans_legacy), now())),
+            date_trunc('month', now()) + interval '3 months',
+            interval '1 month'
+        ) AS month
+    """)
+    op.execute(f'INSERT INTO guard_qr_scans ({COLUMNS}) SELECT {COLUMNS} FROM guard_qr_scans_legacy')
+    op.drop_table('guard_qr_scans_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Les partitions détachées (archives) ne sont pas réintégrées
+    op.create_table('guard_qr_scans_plain',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('qr_code_data', sa.Text(), nullable=False),
+    sa.Column('guard_id', sa.UUID(), nullable=False),
+    sa.Column('form_data_id', sa.UUID(), nullable=True),
+    sa.Column('confirmed', sa.Boolean(), nullable=True),
+    sa.Column('scanned_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['form_data_id'], ['form_data.id'], ),
+    sa.ForeignKeyConstraint(['guard_id'], ['guards.id'], ),
+    sa.PrimaryKeyConstraint('id', name='guard_qr_scans_plain_pkey')
+    )
+    op.execute(f'INSERT INTO guard_qr_scans_plain ({COLUMNS}) SELECT {COLUMNS} FROM guard_qr_scans')
+    op.drop_table('guard_qr_scans')
+    op.execute('DROP FUNCTION guard_qr_scans_create_partition(date)')
+
+    op.rename_table('guard_qr_scans_plain', 'guard_qr_scans')
+    op.execute('ALTER INDEX guard_qr_scans_plain_pkey RENAME TO guard_qr_scans_pkey')
+    op.create_index(op.f('ix_guard_qr_scans_id'), 'guard_qr_scans', ['id'], unique=False)
+    op.create_index(op.f('ix_guard_qr_scans_scanned_at'), 'guard_qr_scans', ['scanned_at'], unique=False)
+    op.create_index('ix_guard_qr_scans_guard_id_scanned_at', 'guard_qr_scans', ['guard_id', 'scanned_at'], unique=False)
@@ -0,0 +1,52 @@
+"""add residence_id to guard_qr_scans and form_data
+
+Revision ID: b8e2f6d4c013
+Revises: a5d8f3c1e947
+Create Date: 2025-10-08 14:22:05.731946
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2f6d4c013'
+down_revision: Union[str, None] = 'a5d8f3c1e947'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Résidence du passe : celle du résident qui l'a créé
+    op.add_column('form_data', sa.Column('residence_id', sa.UUID(), nullable=True))
+    op.execute("""
+        UPDATE form_data SET residence_id = users.residence_id
+        FROM users
+        WHERE form_data.user_id = users.id
+    """)
+    op.create_foreign_key('form_data_residence_id_fkey', 'form_data', 'residences', ['residence_id'], ['id'])
+    op.create_index('ix_form_data_residence_id_created_at', 'form_data', ['residence_id', 'created_at'])
+
+    # Résidence du scan : celle du gardien à l'entrée (propagé à chaque partition)
+    op.add_column('guard_qr_scans', sa.Column('residence_id', sa.UUID(), nullable=True))
+    op.execute("""
+        UPDATE guard_qr_scans SET residence_id = guards.residence_id
+        FROM guards
+        WHERE guard_qr_scans.guard_id = guards.id
+    """)
+    op.alter_column('guard_qr_scans', 'residence_id', nullable=False)
+    op.create_foreign_key('guard_qr_scans_residence_id_fkey', 'guard_qr_scans', 'residences', ['residence_id'], ['id'])
+    op.create_index('ix_guard_qr_scans_residence_id_scanned_at', 'guard_qr_scans', ['residence_id', 'scanned_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_guard_qr_scans_residence_id_scanned_at', table_name='guard_qr_scans')
+    op.drop_constraint('guard_qr_scans_residence_id_fkey', 'guard_qr_scans', type_='foreignkey')
+    op.drop_column('guard_qr_scans', 'residence_id')
+    op.drop_index('ix_form_data_residence_id_created_at', table_name='form_data')
+    op.drop_constraint('form_data_residence_id_fkey', 'form_data', type_='foreignkey')
+    op.drop_column('form_data', 'residence_id')
@@ -0,0 +1,34 @@
+"""add report range indexes
+
+Revision ID: c3e91f07a2d4
+Revises: 75bd5d5fc168
+Create Date: 2025-09-15 10:12:41.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e91f07a2d4'
+down_revision: Union[str, None] = '75bd5d5fc168'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_guard_qr_scans_scanned_at'), 'guard_qr_scans', ['scanned_at'], unique=False)
+    op.create_index('ix_guard_qr_scans_guard_id_scanned_at', 'guard_qr_scans', ['guard_id', 'scanned_at'], unique=False)
+    op.create_index(op.f('ix_attendances_start_time'), 'attendances', ['start_time'], unique=False)
+    op.create_index('ix_attendances_guard_id_start_time', 'attendances', ['guard_id', 'start_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_attendances_guard_id_start_time', table_name='attendances')
+    op.drop_index(op.f('ix_attendances_start_time'), table_name='attendances')
+    op.drop_index('ix_guard_qr_scans_guard_id_scanned_at', table_name='guard_qr_scans')
+    op.drop_index(op.f('ix_guard_qr_scans_scanned_at'), table_name='guard_qr_scans')
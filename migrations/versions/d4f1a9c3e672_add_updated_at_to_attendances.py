@@ -0,0 +1,31 @@
+"""add updated_at to attendances
+
+Revision ID: d4f1a9c3e672
+Revises: b8e2f6d4c013
+Create Date: 2025-10-20 09:18:44.216530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1a9c3e672'
+down_revision: Union[str, None] = 'b8e2f6d4c013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Marqueur de modification lu par le watermark du rapport d'activité : la
+    # clôture d'un service ne change ni max(start_time) ni, s'il est ancien, max(end_time)
+    op.add_column('attendances', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+    op.alter_column('attendances', 'updated_at', server_default=None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('attendances', 'updated_at')
@@ -0,0 +1,35 @@
+"""add updated_at columns
+
+Revision ID: e1a4c7b92f35
+Revises: 9b7d3e2c5a18
+Create Date: 2025-09-26 10:12:38.551902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a4c7b92f35'
+down_revision: Union[str, None] = '9b7d3e2c5a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('residences', 'users', 'form_data', 'guards', 'owners')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        # Les lignes existantes reçoivent l'heure de la migration, puis le
+        # défaut est porté par le modèle (datetime.now / onupdate)
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+        op.alter_column(table, 'updated_at', server_default=None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
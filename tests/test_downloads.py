@@ -0,0 +1,143 @@
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.downloads import _etag, parse_range, stored_file_response
+from app.storage import LocalStorage
+
+KEY = "generated_reports/report.pdf"
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "bytes=-",
+    "bytes=abc-def",
+    "items=0-10",
+    "bytes 0-10",
+    "bytes=0-10,20-30",
+    "bytes=-5, 0-2",
+])
+def test_parse_range_ignores_missing_malformed_and_multi_ranges(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=50-10", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(HTTPException) as exc:
+        parse_range(header, 1000)
+
+    assert exc.value.status_code == 416
+    assert exc.value.headers["Content-Range"] == "bytes */1000"
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.save(KEY, CONTENT)
+    return storage
+
+
+@pytest.fixture
+def client(storage):
+    app = FastAPI()
+
+    @app.get("/download")
+    def download(request: Request, filename: str = "report.pdf"):
+        return stored_file_response(request, storage, KEY, filename, "application/pdf")
+
+    return TestClient(app)
+
+
+def test_full_download(client):
+    response = client.get("/download")
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-disposition"] == 'attachment; filename="report.pdf"'
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("Rapport_d'activité.pdf", "attachment; filename*=utf-8''Rapport_d%27activit%C3%A9.pdf"),
+    ("Bilan_œuvre_😀.pdf", "attachment; filename*=utf-8''Bilan_%C5%93uvre_%F0%9F%98%80.pdf"),
+    ('Rapport_"final".pdf', "attachment; filename*=utf-8''Rapport_%22final%22.pdf"),
+])
+@pytest.mark.parametrize("headers", [{}, {"Range": "bytes=0-9"}])
+def test_content_disposition_escapes_filename(client, filename, expected, headers):
+    response = client.get("/download", params={"filename": filename}, headers=headers)
+
+    assert response.status_code in (200, 206)
+    assert response.headers["content-disposition"] == expected
+
+
+def test_range_download(client):
+    response = client.get("/download", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert response.headers["content-length"] == "10"
+
+
+def test_suffix_range_download(client):
+    response = client.get("/download", headers={"Range": "bytes=-16"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[-16:]
+    assert response.headers["content-range"] == f"bytes {len(CONTENT) - 16}-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+
+def test_multi_range_serves_whole_file(client):
+    response = client.get("/download", headers={"Range": "bytes=0-9,20-29"})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_malformed_range_serves_whole_file(client):
+    response = client.get("/download", headers={"Range": "bytes=ten-twenty"})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/download", headers={"Range": f"bytes={len(CONTENT)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range_matching_etag(client, storage):
+    etag = _etag(storage.stat(KEY))
+    response = client.get("/download", headers={"Range": "bytes=0-9", "If-Range": etag})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+
+def test_if_range_mismatch_serves_whole_file(client):
+    response = client.get("/download", headers={"Range": "bytes=0-9", "If-Range": '"stale-etag"'})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_missing_file(client, storage):
+    storage.delete(KEY)
+    response = client.get("/download")
+
+    assert response.status_code == 404
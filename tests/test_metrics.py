@@ -0,0 +1,24 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import app.metrics  # noqa: F401  (branché sur le chronométrage de querylog)
+
+
+def observed_queries() -> float:
+    return REGISTRY.get_sample_value("welqo_db_query_duration_seconds_count") or 0.0
+
+
+def test_query_latency_observed_for_successful_queries_only():
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        before = observed_queries()
+        connection.execute(text("SELECT 1"))
+        assert observed_queries() == before + 1
+
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        assert observed_queries() == before + 1
+        assert connection.info["query_start_time"] == []
+    engine.dispose()
@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.data import Guard, Owner, RefreshToken, Residence, User
+from app.oauth2 import issue_refresh_token
+from app.postgres_connect import get_db
+from app.ratelimit import get_rate_limit_backend
+from app.routers import guard, owner, user
+from app.utils import hashed
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    tables = [Residence.__table__, User.__table__, Guard.__table__, Owner.__table__, RefreshToken.__table__]
+    Residence.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db):
+    get_rate_limit_backend.cache_clear()
+    app = FastAPI()
+    for router in (user.router, guard.router, owner.router):
+        app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    get_rate_limit_backend.cache_clear()
+
+
+def create_accounts(db, model):
+    home = Residence(name="Résidence")
+    fields = {"appartement": "101", "resident": "propriétaire"} if model is User else {}
+    account = model(name="Compte", phone_number="+221770000000", password=hashed("ancien"), residence=home, **fields)
+    other = model(name="Autre", phone_number="+221770000001", password=hashed("ancien"), residence=home, **fields)
+    db.add_all([home, account, other])
+    db.commit()
+    return account, other
+
+
+def assert_only_account_sessions_revoked(db, role, account, other, request):
+    sessions = [issue_refresh_token(db, role, account.id)[1] for _ in range(2)]
+    other_session = issue_refresh_token(db, role, other.id)[1]
+    db.commit()
+
+    assert request().status_code == 200
+    for session in sessions:
+        db.refresh(session)
+        assert session.revoked_at is not None
+    db.refresh(other_session)
+    assert other_session.revoked_at is None
+
+
+@pytest.mark.parametrize("model, role, path", [
+    (User, "user", "/users/reset-password"),
+    (Guard, "guard", "/guards/reset-password"),
+    (Owner, "owner", "/owners/reset-password"),
+])
+def test_reset_password_revokes_refresh_tokens(client, db, model, role, path):
+    account, other = create_accounts(db, model)
+
+    assert_only_account_sessions_revoked(db, role, account, other, lambda: client.post(path, json={
+        "phone_number": account.phone_number, "new_password": "nouveau", "confirm_password": "nouveau",
+    }))
+
+
+def test_change_password_revokes_refresh_tokens(client, db):
+    account, other = create_accounts(db, User)
+
+    assert_only_account_sessions_revoked(db, "user", account, other, lambda: client.put("/users/change-password", json={
+        "phone_number": account.phone_number, "old_password": "ancien", "new_password": "nouveau",
+    }))
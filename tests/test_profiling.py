@@ -0,0 +1,44 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.profiling import ProfilingMiddleware
+
+TOKEN = "profiling-test-token"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    monkeypatch.setattr(settings, "profiling_token", TOKEN)
+    monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/")
+    async def root():
+        return {"status": "online"}
+
+    return TestClient(app)
+
+
+def test_profiles_request_with_header(client, tmp_path):
+    response = client.get("/", headers={"X-Profile": TOKEN})
+
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    assert (tmp_path / profile_id / "summary.json").exists()
+
+
+@pytest.mark.parametrize("headers, query", [
+    ({"X-Profile": "wrong-token"}, ""),
+    ({}, f"?__profile={TOKEN}"),
+])
+def test_ignores_invalid_or_query_token(client, tmp_path, headers, query):
+    response = client.get(f"/{query}", headers=headers)
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert not any(tmp_path.iterdir())
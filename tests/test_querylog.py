@@ -0,0 +1,82 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.main import query_budget_exceeded_handler
+from app.querylog import QueryBudgetExceeded, QueryLogMiddleware, query_budget
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def strict(monkeypatch):
+    monkeypatch.setattr(settings, "query_strict", True)
+    monkeypatch.setattr(settings, "query_repeat_threshold", 5)
+
+
+@pytest.fixture
+def client(engine):
+    app = FastAPI()
+    app.add_middleware(QueryLogMiddleware)
+    app.add_exception_handler(QueryBudgetExceeded, query_budget_exceeded_handler)
+
+    @app.get("/budget/{queries}", dependencies=[query_budget(2)])
+    def within_budget(queries: int):
+        with engine.connect() as connection:
+            for i in range(queries):
+                connection.execute(text(f"SELECT {i}"))
+        return {"queries": queries}
+
+    @app.get("/repeat/{queries}")
+    def repeat(queries: int):
+        with engine.connect() as connection:
+            for _ in range(queries):
+                connection.execute(text("SELECT 1"))
+        return {"queries": queries}
+
+    return TestClient(app)
+
+
+def test_within_budget(client, strict):
+    response = client.get("/budget/2")
+
+    assert response.status_code == 200
+
+
+def test_budget_exceeded_in_strict_mode(client, strict):
+    response = client.get("/budget/3")
+
+    assert response.status_code == 500
+    assert "Budget de 2 requêtes SQL dépassé" in response.json()["detail"]
+
+
+def test_budget_exceeded_is_only_logged_by_default(client, caplog):
+    response = client.get("/budget/3")
+
+    assert response.status_code == 200
+    assert "Budget SQL dépassé" in caplog.text
+
+
+def test_repeated_statement_in_strict_mode(client, strict):
+    assert client.get("/repeat/4").status_code == 200
+
+    response = client.get("/repeat/5")
+    assert response.status_code == 500
+    assert "N+1 probable" in response.json()["detail"]
+
+
+def test_failed_query_releases_start_time(engine):
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+
+        assert connection.info["query_start_time"] == []
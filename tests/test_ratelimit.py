@@ -0,0 +1,63 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.ratelimit import get_rate_limit_backend, password_reset_throttle
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_backend", "memory")
+    monkeypatch.setattr(settings, "password_reset_max_attempts_per_phone", 3)
+    get_rate_limit_backend.cache_clear()
+
+    app = FastAPI()
+
+    @app.post("/forgot-password", dependencies=[Depends(password_reset_throttle("user", "forgot"))])
+    def forgot_password():
+        return {"message": "ok"}
+
+    @app.post("/reset-password", dependencies=[Depends(password_reset_throttle("user", "reset"))])
+    def reset_password():
+        return {"message": "ok"}
+
+    yield TestClient(app)
+    get_rate_limit_backend.cache_clear()
+
+
+def test_forgot_password_is_limited_per_phone(client):
+    body = {"phone_number": "+221770000001"}
+    for _ in range(3):
+        assert client.post("/forgot-password", json=body).status_code == 200
+
+    response = client.post("/forgot-password", json=body)
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+    assert client.post("/forgot-password", json={"phone_number": "+221770000002"}).status_code == 200
+
+
+def test_reset_password_has_its_own_limit(client):
+    body = {"phone_number": "+221770000001"}
+    for _ in range(3):
+        assert client.post("/forgot-password", json=body).status_code == 200
+
+    # Le parcours complet (vérification puis réinitialisation) ne se bloque pas lui-même
+    for _ in range(3):
+        assert client.post("/reset-password", json=body).status_code == 200
+    assert client.post("/reset-password", json=body).status_code == 429
+
+
+@pytest.mark.parametrize("payload", [{"json": {}}, {"json": {"phone_number": "  "}}, {"content": b"not json"}])
+def test_missing_phone_only_counts_against_the_ip(client, monkeypatch, payload):
+    monkeypatch.setattr(settings, "password_reset_max_attempts_per_ip", 10)
+
+    # Au-delà du quota par numéro, mais pas de compteur commun aux requêtes sans numéro
+    for _ in range(5):
+        assert client.post("/forgot-password", **payload).status_code == 200
+    assert client.post("/forgot-password", json={"phone_number": "+221770000001"}).status_code == 200
+
+    # La limite par IP reste appliquée
+    for _ in range(4):
+        client.post("/forgot-password", **payload)
+    assert client.post("/forgot-password", **payload).status_code == 429
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers.export import DEFAULT_EXPORT_WINDOW
+from app.routers.report import resolve_period, resolve_report_period
+
+
+def test_default_window_ends_now():
+    date_from, date_to = resolve_period(None, None, DEFAULT_EXPORT_WINDOW)
+
+    assert abs(datetime.now() - date_to) < timedelta(seconds=5)
+    assert date_to - date_from == DEFAULT_EXPORT_WINDOW
+
+
+def test_aware_bounds_become_naive_local_time():
+    date_to = datetime(2025, 10, 1, 12, 0, tzinfo=timezone.utc)
+    date_from, resolved_to = resolve_period(None, date_to, timedelta(days=7))
+
+    assert resolved_to.tzinfo is None
+    assert resolved_to == date_to.astimezone().replace(tzinfo=None)
+    assert date_from == resolved_to - timedelta(days=7)
+
+
+def test_start_after_end_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        resolve_period(datetime(2025, 10, 2), datetime(2025, 10, 1), DEFAULT_EXPORT_WINDOW)
+
+    assert exc.value.status_code == 400
+
+
+def test_report_period_uses_report_type_window():
+    date_to = datetime(2025, 10, 1)
+
+    assert resolve_report_period("security_report", None, date_to) == (date_to - timedelta(days=7), date_to)
+    assert resolve_report_period("activity_report", None, date_to) == (date_to - timedelta(days=30), date_to)
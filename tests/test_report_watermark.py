@@ -0,0 +1,40 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.data import Attendance, Guard, Residence
+from app.routers.report import get_data_watermark
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    tables = [Residence.__table__, Guard.__table__, Attendance.__table__]
+    Residence.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_activity_watermark_changes_when_an_older_shift_is_closed(db):
+    now = datetime.now()
+    residence = Residence(name="Résidence")
+    guard = Guard(name="Gardien", phone_number="+221770000000", password="x", residence=residence)
+    old_shift = Attendance(guard=guard, start_time=now - timedelta(hours=20))
+    recent_shift = Attendance(guard=guard, start_time=now - timedelta(hours=10), end_time=now - timedelta(hours=2))
+    db.add_all([residence, guard, old_shift, recent_shift])
+    db.commit()
+
+    window = (residence.id, now - timedelta(days=1), now)
+    before = get_data_watermark(db, "activity_report", *window)
+
+    # Clôture du service le plus ancien : max(start_time), max(end_time) et count inchangés
+    time.sleep(0.01)
+    old_shift.end_time = now - timedelta(hours=12)
+    db.commit()
+
+    assert get_data_watermark(db, "activity_report", *window) != before
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.data import Owner, Residence
+from app.postgres_connect import get_db
+from app.routers import residence
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Residence.metadata.create_all(engine, tables=[Residence.__table__, Owner.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(residence.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def test_owner_changes_update_the_list_etag(client, db):
+    home = Residence(name="Résidence")
+    owner = Owner(name="Gestionnaire", phone_number="+221770000000", password="x", residence=home)
+    db.add_all([home, owner])
+    db.commit()
+
+    first = client.get("/residences/")
+    etag = first.headers["etag"]
+    assert client.get("/residences/", headers={"If-None-Match": etag}).status_code == 304
+
+    # Seul le gestionnaire change : la ligne de la résidence reste intacte
+    time.sleep(0.01)
+    owner.name = "Nouveau gestionnaire"
+    db.commit()
+
+    response = client.get("/residences/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["owners"][0]["name"] == "Nouveau gestionnaire"
+
+    db.add(Owner(name="Second", phone_number="+221770000001", password="x", residence=home))
+    db.commit()
+    assert client.get("/residences/", headers={"If-None-Match": response.headers["etag"]}).status_code == 200
@@ -0,0 +1,46 @@
+import pytest
+
+from app.storage import LocalStorage, Storage
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        Storage()
+
+
+def test_local_storage_round_trip(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.save("generated_reports/report.pdf", b"0123456789")
+
+    assert storage.exists("generated_reports/report.pdf")
+    assert storage.stat("generated_reports/report.pdf").size == 10
+    assert b"".join(storage.iter_range("generated_reports/report.pdf", 2, 5)) == b"2345"
+    assert [obj.key for obj in storage.list("generated_reports")] == ["generated_reports/report.pdf"]
+
+    storage.delete("generated_reports/report.pdf")
+    assert not storage.exists("generated_reports/report.pdf")
+
+
+@pytest.mark.parametrize("key", [
+    "../secret.txt",
+    "generated_reports/../../secret.txt",
+    "../" + "x" * 3,
+    "/etc/passwd",
+])
+def test_local_storage_rejects_keys_outside_root(tmp_path, key):
+    storage = LocalStorage(str(tmp_path / "root"))
+
+    with pytest.raises(ValueError):
+        storage.save(key, b"data")
+    with pytest.raises(ValueError):
+        storage.stat(key)
+    with pytest.raises(ValueError):
+        storage.delete(key)
+    assert not (tmp_path / "secret.txt").exists()
+
+
+def test_local_storage_accepts_dotdot_inside_root(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.save("generated_reports/../uploaded_logos/logo.png", b"png")
+
+    assert storage.exists("uploaded_logos/logo.png")